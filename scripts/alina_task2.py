@@ -15,6 +15,10 @@ Version    Date       Name
            Initial release
     1.2    07.06.2023 Evgenii Churiulin, MPI-BGC
            Code refactoring
+    1.3    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Output table is saved with l4s.write_tables (selectable format)
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Fast default format of tables (l4s.table_format)
 """
 # =============================     Import modules     ==================
 # -- Standard:
@@ -52,8 +56,12 @@ pout = main + '/OUTPUT'
 
 # -- Select name for output file'
 pout_xlsx = pout + f'/data4_{exp}'
-# -- Output format for:
-form_table = '.xlsx'
+# -- Output format for ('.xlsx', '.csv', '.parquet', '.feather'), default -
+#    parquet (or csv without pyarrow):
+form_table = l4s.table_format
+
+# -- Number of processes for parallel calculations:
+nworkers = 4
 
 # -- Settings for excel files
 set4excel = {
@@ -83,7 +91,7 @@ if __name__ == '__main__':
 
     # -- Part 2. Run quality control test (important for the first run):
     if ldata_quality is True:
-        l4p.metainfo_control(lst4names, lst4paths, set4excel)
+        l4p.metainfo_control(lst4names, lst4paths, set4excel, workers = nworkers)
 
     # -- Part 3. Get data:
     # Get data from our experiments (only data preprocessing):
@@ -111,5 +119,5 @@ if __name__ == '__main__':
     l4s.makefolder(pout)      if lmake_folder  is True else print('lmake_folder = False')
     l4s.dep_clean(pout + '/') if lclean_folder is True else print('lclean_folder = False')
     # -- Save output files for experiment:
-    df_exp.to_excel(pout_xlsx + form_table,  sheet_name = f'{exp}_data')
+    l4s.write_tables({f'{exp}_data' : df_exp}, pout_xlsx, form_table)
 # =============================    End of program   ======================
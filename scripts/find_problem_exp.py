@@ -15,39 +15,52 @@ Version    Date       Name
            Initial release
     1.2    07.06.2023 Evgenii Churiulin, MPI-BGC
            Code refactoring
+    1.3    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Use sample number from tic_toc results
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Tables are read and saved with l4s.read_table / l4s.write_tables
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Fast default format of tables (l4s.table_format)
 """
 
 # =============================     Import modules     ==============
 import numpy as np
 import pandas as pd
+# Personal:
+import lib4sys_support as l4s
 # =============================   Personal functions   ==============
 # -- find_problem_exp --> Find "potential" missing numbers for the research experiment
 def find_problem_exp(
         # Input variables:
         pin:str,                      # Input path with post-processing data. Result of tic-toc script
+                                      # (without extension)
         exp:str,                      # Research experiment
-        pout:str,                     # Output path
+        pout:str,                     # Output path (without extension)
         split_by:str,                 # Parameter for spliting
+        form:str = l4s.table_format,  # Format of tables
         # Output variables:
-    ):                                # Create a new file in .xlsx format in output folder
+    ):                                # Create a new file in output folder
     # -- Local parameters for function:
     int4col  = 'int32'       # type of values 
     ser_name = 'miss_value'  # name of column
     step     = 1             # step in range of  min -- max values
     # -- Read experiment data after post-processing:
-    df = pd.read_excel(pin)
-    # -- Create column with experiment name:
-    df['exp' ] = (
-        df['probenname'].str.split(split_by, expand = True)
-                        .loc[:,[0]]
-                        .rename(columns = {0 : 'exp'})
-    ) 
-    # -- Create column with experiment number:
-    df['num'] = (
-        df['probenname'].str.split(split_by, expand = True)
-                        .loc[:,[1]]
-                        .rename(columns = {1 : 'verd'})
-    )
+    df = l4s.read_table(pin, f'data_{exp}', form)
+    # -- Columns with experiment name and number are in results of tic_toc,
+    #    for old results we get them from probenname:
+    if 'num' not in df.columns:
+        # -- Create column with experiment name:
+        df['exp' ] = (
+            df['probenname'].str.split(split_by, expand = True)
+                            .loc[:,[0]]
+                            .rename(columns = {0 : 'exp'})
+        ) 
+        # -- Create column with experiment number:
+        df['num'] = (
+            df['probenname'].str.split(split_by, expand = True)
+                            .loc[:,[1]]
+                            .rename(columns = {1 : 'verd'})
+        )
     df['num'] = df['num'].astype(int4col)
     # -- Define the full list of possible numbers:
     min_num = np.min(df['num'])
@@ -60,7 +73,7 @@ def find_problem_exp(
             pot_prob.append(f'{exp} {i}')
     problem_numbers = pd.Series(pot_prob).rename(ser_name)
     # -- Save output files
-    problem_numbers.to_excel(pout, sheet_name = f'{exp}_data')
+    l4s.write_tables({f'{exp}_data' : problem_numbers.to_frame()}, pout, form)
     return df
 
 # ================   User settings (have to be adapted)  ==============
@@ -77,15 +90,15 @@ set4exp = {
 }
 split_by = set4exp.get(exp)
 
-# -- Output format for file:
-form_table = '.xlsx'
+# -- Format of tables (the same as in tic_toc):
+form_table = l4s.table_format
 
 # -- User paths (Common, intup and output):
 main = 'C:/evchur/scripts/project_tic_toc/DATA/OUTPUT' # Path was changed
-pin  = main + f'/data4_{exp}{form_table}'
-pout = main + f'/no_data4{exp}{form_table}'
+pin  = main + '/tic_toc'
+pout = main + f'/no_data4{exp}'
 
 # =============================    Main program   =====================
 if __name__ == '__main__':
-    df = find_problem_exp(pin, exp, pout, split_by)
+    df = find_problem_exp(pin, exp, pout, split_by, form_table)
 # =============================    End of program   ===================
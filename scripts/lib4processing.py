@@ -17,116 +17,402 @@ Version    Date       Name
            Code refactoring
     1.3    09.08.2023 Evgenii Churiulin, MPI-BGC
            Add new function for data processing
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add cache for preprocessed excel data
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add parallel preprocessing of excel data
+    1.6    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Vectorized cleaning of excel data
+    1.7    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add schemas for reading of excel data
+    1.8    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add incremental update of preprocessed data
+    1.9    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Fast aggregation of unique values
+    1.10   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Get average data for all parameters in one step
+    1.11   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add compact data types for preprocessed data
+    1.12   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add structured sample id and index of experiments
+    1.13   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add rules for problem values (flags)
+    1.14   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Resampling of meteo data with several aggregates in one pass
+    1.15   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add resolution pyramid of meteo data
+    1.16   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add station archive partitioned by year and month
+    1.17   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add class StationSeries (time slices of station data)
+    1.18   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Header of excel file is read without loading of the whole workbook
+    1.19   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Only float values are kept in numeric columns (as before 1.6)
+    1.20   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Columns of schema are found in any register, information about
+           data before and after schema
+    1.21   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Excel files are hashed only if size or mtime are changed
+    1.22   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Groupby of select_data with categorical codes of keys and values
+    1.23   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Level of pyramid is found by time steps (without pd.date_range)
+    1.24   18.10.2026 Evgenii Churiulin, MPI-BGC
+           StationSeries doesn't change index of input dataframe
+    1.25   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Aggregates of precipitation and soil moisture for Versuchsbeete
+    1.26   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Date without time as end of time window is the whole day
+           (time_stop), soil moisture profiles of StationSeries (instead of
+           get_complex_plot_data, data is sliced by Complex_PLT)
+    1.27   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Excel files with unreadable headers are reported by metainfo_control
+           with other problem files
 """
 
 # =============================     Import modules     =======================
 # -- Standard:
 import os
+import json
 import sys
+import shutil
+import operator
 import numpy as np
 import pandas as pd
 from re import match
-from typing import Optional
+from typing import Optional, Union
 import warnings
 warnings.filterwarnings("ignore")
 # 1.2: Personal modules
 sys.path.append(os.path.join(os.getcwd(), '..'))
 import lib4sys_support
 
+# -- Operators for rules (flag_rows). Missing values don't break rules:
+rule_ops = {
+    '<'  : operator.lt,
+    '<=' : operator.le,
+    '>'  : operator.gt,
+    '>=' : operator.ge,
+    '==' : operator.eq,
+    '!=' : operator.ne,
+}
+
+# -- Version of get_data output. Change it if preprocessing was changed, then
+#    all cached files will be automatically updated:
+cache_version = '1.5'
+
+# -- Schemas for reading of excel data. Keys are column names in excel file
+#    (other columns are not read). Parameters of columns:
+#    dtype  - data type of column ('float' - text values are ignored)
+#    format - time format (only for columns with dates)
+#    lstrip - do you want to delete spaces from values?
+#    llower - do you want to change register of values to lower?
+# a. Data for TIC and TOC experiments (get_data):
+schema4tic_toc = {
+    #                      dtype     format    lstrip llower
+    'Probenname'       : ['object', None      , True , True ],
+    'Probenjahr'       : ['int32' , None      , False, False],
+    'Parameter'        : ['object', None      , False, True ],
+    'Ergebnis'         : ['float' , None      , False, False],
+    'Einheit'          : ['object', None      , False, True ],
+    'Vermuffelt'       : ['object', None      , False, True ],
+    'Kommentar'        : ['object', None      , False, True ],
+    'Probennahmedatum' : ['object', '%Y-%m-%d', False, False],
+}
+# b. Data for Akanksha tasks (get_data4akanksha):
+schema4akanksha = {
+    #                      dtype     format    lstrip llower
+    'Probenname'       : ['object', None      , True , True ],
+    'Probenjahr'       : ['str'   , None      , False, False],
+    'Nummer'           : ['str'   , None      , False, False],
+    'Parameter'        : ['object', None      , False, True ],
+    'Ergebnis'         : ['float' , None      , False, False],
+    'Messdatum'        : ['object', '%Y-%m-%d', False, False],
+    'Kommentar'        : ['object', None      , True , True ],
+    'Probennahmedatum' : ['object', '%Y-%m-%d', False, False],
+}
+
+# -- Settings for compact data types of preprocessed data (compact_data):
+set4compact = {
+    # Columns with repetitive text values (type category):
+    'cat_cols' : ['probenname', 'parameter', 'einheit', 'vermuffelt',
+                  'kommentar' , 'excel_doc', 'exp'     , 'suffix'    ],
+    # Columns with numbers (type float32 if precision allows it):
+    'flt_cols' : ['ergebnis'],
+    # Columns with dates (type datetime64):
+    'dat_cols' : ['probennahmedatum'],
+    # Maximum relative error for float32 values:
+    'rtol'     : 1e-6,
+}
+
+# -- Structure of sample id (probenname): experiment code, sample number and
+#    optional suffix. For example: mh40722 --> mh, 40722; mh-r12a --> mh-r, 12, a
+id_pattern = r'^(?P<exp>[a-z-]*?)(?P<num>[0-9]+)(?P<suffix>.*)$'
+id_cols = ['exp', 'num', 'suffix']
+
+# -- Aggregates of meteo data (resample_data). Keys are patterns of column names,
+#    other columns get default aggregate. First aggregate keeps column name,
+#    other aggregates get names f'{param}_{agg} ({unit})', for example
+#    'T (degC)' --> 'T (degC)', 'T_min (degC)', 'T_max (degC)':
+set4resample = {
+    r'^rain '  : ['sum', 'count'],          # Precipitation (+ number of valid values)
+    r'^ppt '   : ['sum', 'count'],          # Precipitation (Versuchsbeete)
+    r'^T '     : ['mean', 'min', 'max'],    # Air temperature
+    r'(?i)^sm[a-d]?\d+ ' : ['mean', 'min', 'max'],  # Soil moisture (SM008, sma010)
+}
+agg_default = 'mean'
+
+# -- Frequencies of resampling (hourly, daily, weekly - from monday, monthly):
+set4freq = {
+    'hour'  : '1h',
+    'day'   : '1D',
+    'week'  : 'W-MON',
+    'month' : 'MS',
+}
+
+# -- Levels of resolution pyramid (level : frequency, None - raw 10 minutes data).
+#    Levels are ordered from fine to coarse:
+pyramid_levels = {
+    '10min' : None,
+    'hour'  : 'hour',
+    'day'   : 'day',
+    'month' : 'month',
+}
+
+# -- Time steps of pyramid levels (month - mean length of month) for number of
+#    points in time window (pyramid_level):
+pyramid_steps = {
+    '10min' : '10min',
+    'hour'  : '1h',
+    'day'   : '1D',
+    'month' : '30.436875D',
+}
+
+# -- Partitions of station archive (level : period of one file, None - one
+#    file for all data). Files: {station}/{level}/{year}/{month}, {station}/{level}/{year}
+#    or {station}/{level}/all:
+archive_parts = {
+    '10min' : 'M',
+    'hour'  : 'M',
+    'day'   : 'Y',
+    'month' : None,
+}
+
 # =============================   Personal functions   =======================
 
+# -- get_header --> Read only header of excel file (only sheet and row with
+#                   header are loaded, not the whole workbook)
+def get_header(
+        # Input variables:
+        pin:str,                            # Excel file input path
+        set4excel:dict,                     # Excel file settings
+        # Output variables:
+    ) -> tuple[list, str]:                  # Columns of excel file or error message
+    sheet = set4excel.get('sheet_name')
+    row   = (set4excel.get('skiprows') or 0) + (set4excel.get('header') or 0)
+    try:
+        values = read_header_row(pin, sheet, row)
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+    # -- Empty cells at the end of header row are ignored:
+    values = list(values)
+    while len(values) > 0 and values[-1] == '':
+        values.pop()
+    return values, None
+# ------------------------------------------------------------------------------
+
+# -- read_header_row --> Read one row of excel sheet (xls - xlrd, xlsx - openpyxl)
+def read_header_row(
+        # Input variables:
+        pin:str,                            # Excel file input path
+        sheet:Union[str, int],              # Sheet name or index
+        row:int,                            # Row index (from 0)
+        # Output variables:
+    ) -> list:                              # Values of row
+    if pin.lower().endswith('.xls'):
+        # -- Old excel format (xlrd): sheets are loaded on demand
+        import xlrd
+        book = xlrd.open_workbook(pin, on_demand = True)
+        try:
+            if isinstance(sheet, str):
+                values = book.sheet_by_name(sheet).row_values(row)
+            else:
+                values = book.sheet_by_index(sheet or 0).row_values(row)
+        finally:
+            book.release_resources()
+    else:
+        # -- New excel format (openpyxl): rows are read one by one
+        import openpyxl
+        book = openpyxl.load_workbook(pin, read_only = True, data_only = True)
+        try:
+            if isinstance(sheet, str):
+                ws = book[sheet]
+            else:
+                ws = book.worksheets[sheet or 0]
+            values = next(ws.iter_rows(min_row = row + 1, max_row = row + 1,
+                                       values_only = True), ())
+        finally:
+            book.close()
+        values = ['' if value is None else value for value in values]
+    return values
+# ------------------------------------------------------------------------------
+
 # --  metainfo_control ->  Fast quality control test. Headers in files should be the same!
 def metainfo_control(
         # Input variables:
         ds_names:list[str],                 # Excel file names
         ds_paths:list[str],                 # Excel file input paths
         set4excel:dict,                     # Excel file settings
+        workers: Optional[int] = 1,         # Number of processes for reading headers
         # Output variables:
     ):                                      # Function print text or stop program
+    #-- Read headers (only one row) from all datasets, files which can not be
+    #   read are reported with other problem files:
+    results = lib4sys_support.run_parallel(
+        get_header, [(path, set4excel) for path in ds_paths], workers)
+    lst4errors = []
+    for name, (header, err) in zip(ds_names, results):
+        if err is not None:
+            print(f'Header in {name} can not be read: {err}')
+            lst4errors.append(name)
+    #-- Check headers with reference header (the first readable dataset):
+    lst4ok = [i for i, (header, err) in enumerate(results) if err is None]
+    lst4problems = []
+    for i in lst4ok[1:]:
+        if results[i][0] == results[lst4ok[0]][0]:
+            print(f'Header in {ds_names[lst4ok[0]]} and {ds_names[i]} is the same')
+        else:
+            print(f'Header in {ds_names[i]} is different')
+            lst4problems.append(ds_names[i])
+    #-- Stop program after checking of all datasets:
+    if len(lst4problems) + len(lst4errors) > 0:
+        reference = ds_names[lst4ok[0]] if len(lst4ok) > 0 else '-'
+        sys.exit(
+            f'Headers are different from {reference} in '
+            f'{len(lst4problems)} files: {", ".join(lst4problems)}; '
+            f'headers can not be read in {len(lst4errors)} files: '
+            f'{", ".join(lst4errors)}'
+        )
+# ------------------------------------------------------------------------------
 
-    #-- Check headers from 2 different datasets
-    for i in range(len(ds_names)):
-        if i + 1 <= len(ds_names) - 1:
-            #-- Columns from the first dataset:
-            col_df1 = (
-                pd.read_excel(
-                    ds_paths[i],
-                    #-- Settings for reading .xls files
-                    sheet_name = set4excel.get('sheet_name'),
-                    skiprows   = set4excel.get('skiprows'),
-                    header     = set4excel.get('header'),
-                ).columns.to_list()
-            )
-            #-- Columns from the second dataset:
-            col_df2 = (
-                pd.read_excel(
-                    ds_paths[i + 1],
-                    #-- Settings for reading .xls files
-                    sheet_name = set4excel.get('sheet_name'),
-                    skiprows   = set4excel.get('skiprows'),
-                    header     = set4excel.get('header'),
-                ).columns.to_list()
-            )
-            #-- Check columns
-            if col_df1 == col_df2:
-                print(f'Header in {ds_names[i]} and {ds_names[i+1]} is the same')
-            else:
-                print(f'Header in {ds_names[i+1]} is different')
-                sys.exit()
+# -- lower_columns --> All column names in one register (lower)
+def lower_columns(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data
+        # Output variables:
+    ) -> pd.DataFrame:                      # Research data with new column names
+    return df.rename(columns = {col : col.lower() for col in df.columns})
 # ------------------------------------------------------------------------------
 
-# -- get_data --> Preprocessing of excel data
-def get_data(
+# -- numeric_rows --> Select rows with float values (or empty cells) in column.
+#                    Text, integer and numeric string values are ignored (the
+#                    same as check isinstance(value, float) for each row)
+def numeric_rows(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data
+        col:str,                            # Column with numbers
+        dtype:str = 'float',                # Data type for column
+        # Output variables:
+    ) -> pd.DataFrame:                      # Research data without text in column
+    values = df[col]
+    if values.dtype == object:
+        # -- Mixed column (for example 'Probe alle' or 5 in column with floats):
+        lcheck = np.fromiter(
+            (isinstance(value, float) for value in values.to_numpy()),
+            dtype = bool, count = len(values),
+        )
+    else:
+        lcheck = np.full(len(values), pd.api.types.is_float_dtype(values.dtype))
+    return df.loc[lcheck].assign(**{col : values[lcheck].astype(dtype)})
+# ------------------------------------------------------------------------------
+
+# -- apply_schema --> Data types, time format and register of excel data
+def apply_schema(
+        # Input variables:
+        df:pd.DataFrame,                    # Excel data (columns from schema)
+        schema:dict,                        # Schema of excel data
+        # Output variables:
+    ) -> pd.DataFrame:                      # Excel data with lower column names
+    #-- Integer and string values (read_excel gets these types during reading):
+    df = df.astype({col: prm[0] for col, prm in schema.items()
+                    if prm[0] not in ['object', 'float']})
+    #-- Numbers (text values are ignored):
+    for col, (dtype, tformat, lstrip, llower) in schema.items():
+        if dtype == 'float':
+            df = numeric_rows(df, col, dtype)
+    #-- Dates and text values:
+    for col, (dtype, tformat, lstrip, llower) in schema.items():
+        if tformat is not None:
+            df[col] = pd.to_datetime(df[col], format = tformat)
+        if df[col].dtype == object and lstrip:
+            df[col] = df[col].str.replace(' ', '', regex = False)
+        if df[col].dtype == object and llower:
+            df[col] = df[col].str.lower()
+    #-- Rename colums (all columns name should be in one register):
+    return lower_columns(df)
+# ------------------------------------------------------------------------------
+
+# -- read_excel_schema --> Read excel data based on schema
+def read_excel_schema(
         # Input variables:
         pin:str,                            # Excel file input paths
-        df_name:str,                        # Excel file names
         set4excel:dict,                     # Excel file settings
-        linfo: Optional[bool] = True,       # Do you want to get more information about data?
+        schema:dict,                        # Schema of excel data
+        df_name: Optional[str] = None,      # Excel file name (for information about data)
+        linfo: Optional[bool] = False,      # Do you want to get information about raw data?
         # Output variables:
-    ) -> pd.DataFrame:                      # Preprocessed data collected in one dataframe
-    # -- Local variables:
-    # Data types for columns:
-    int4col = 'int32'
-    flt4col = 'float'
-    dat4col = '%Y-%m-%d'
-
-    #-- Read data (excel file should have the same structure):
+    ) -> pd.DataFrame:                      # Excel data with lower column names
+    #-- Columns of schema (register of names in excel file can be different):
+    dct4names = {col.lower() : col for col in schema}
+    #-- Read only columns from schema (excel file should have the same structure),
+    #   columns with integer and string values get final type during reading:
     df = pd.read_excel(
         pin,
         sheet_name = set4excel.get('sheet_name'),
-        skiprows = set4excel.get('skiprows'),
-        header = set4excel.get('header'),
+        skiprows   = set4excel.get('skiprows'),
+        header     = set4excel.get('header'),
+        usecols    = lambda col: str(col).lower() in dct4names,
+        dtype      = {col: prm[0] for col, prm in schema.items()
+                        if prm[0] not in ['object', 'float']},
     )
-    # -- Get first information about data:
+    df = df.rename(columns = {col : dct4names[str(col).lower()] for col in df.columns})
+    # -- Get first information about data (before data types of schema):
     if linfo == True:
         lib4sys_support.get_info(df, df_name)
-    #-- Rename colums (all columns name should be in one register):
-    for col in df.columns.to_list():
-        df = df.rename(columns={col : col.lower()})
-    #-- Change type of data for columns (if it is needed):
-    # a. In columns (probenjahr and nummer - type int64 --> change to int32):
-    df['probenjahr'] = df['probenjahr'].astype(int4col)
-    df['nummer'] = df['nummer'].astype(int4col)
-    # b. In columns (ergebnis - type object --> change to float):
-    #   Check why we have this problem
-    def check_data(row):
-        return isinstance(row['ergebnis'], float)
-
-    df['lcheck'] = df.apply(check_data, axis = 1)
-    df = (df.loc[df.loc[:,'lcheck'] == True]
-            .drop('lcheck', axis = 1)
-    )
-    df['ergebnis'] = df['ergebnis'].astype(flt4col)
-    # c. Change register for all columns with object type:
-    for col in df.loc[:, df.dtypes == object]:
-        df[col] = df[col].str.lower()
-    # d. Change time format in messdatum and probennahmedatum columns:
-    df['messdatum'] = pd.to_datetime(df['messdatum'], format = dat4col)
-    df['probennahmedatum'] = pd.to_datetime(df['probennahmedatum'], format = dat4col)
-    # e. Delete space from probennamen:
-    def space(row):
-        return row['probenname'].replace(" ", "")
-    df['probenname'] = df.apply(space, axis = 1)
+    return apply_schema(df, schema)
+# ------------------------------------------------------------------------------
+
+# -- split_probenname --> Get structured sample id from probenname
+def split_probenname(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data with column probenname
+        # Output variables:
+    ) -> pd.DataFrame:                      # Research data with columns exp, num and suffix
+    # -- Parse only unique sample names:
+    names = pd.Series(df['probenname'].unique())
+    df_ids = names.str.extract(id_pattern)
+    df_ids['probenname'] = names
+    df_ids = df_ids.astype({
+        'exp'   : 'category',
+        'num'   : 'Int64',
+        'suffix': 'category',
+    })
+    return df.merge(df_ids, on = 'probenname', how = 'left').set_axis(df.index)
+# ------------------------------------------------------------------------------
+
+# -- get_data --> Preprocessing of excel data
+def get_data(
+        # Input variables:
+        pin:str,                            # Excel file input paths
+        df_name:str,                        # Excel file names
+        set4excel:dict,                     # Excel file settings
+        linfo: Optional[bool] = True,       # Do you want to get more information about data?
+        # Output variables:
+    ) -> pd.DataFrame:                      # Preprocessed data collected in one dataframe
+    #-- Read data. Columns get data types, time format and register from
+    #   schema, columns which we don't want to use are not read:
+    df = read_excel_schema(pin, set4excel, schema4tic_toc, df_name, linfo)
 
     #-- We should ignore experiments with "Verdünnung prefix' in kommentar
     """
@@ -159,115 +445,519 @@ def get_data(
             .drop(['verd', 'exp'], axis = 1)
     )
     """
-    # -- Delete columns which we don't want to use:
-    df = df.drop(['nummer', 'instrument', 'messdatum'], axis = 1)
     # -- Add additional column with excel file name:
-    exp_name = (
-        pd.Series(np.nan, index = df.index)
-          .replace(np.nan, df_name)
-          .rename('excel_doc')
-    )
-    df = pd.concat([df, exp_name], axis = 1)
-    # -- Additional quality control (We have columns with NaN values, but at
-    #    this step it is fine and we delete such columns later, otherwise we can,
-    #    get different number of columns).
+    df['excel_doc'] = df_name
+    # -- Get structured sample id (experiment code, number and suffix):
+    df = split_probenname(df)
+    # -- Additional quality control (after data types of schema):
     if linfo == True:
         lib4sys_support.get_info(df, df_name)
     return df
 # ------------------------------------------------------------------------------
 
+# -- compact_data --> Compact data types for preprocessed data
+def compact_data(
+        # Input variables:
+        df:pd.DataFrame,                    # Preprocessed data
+        linfo: Optional[bool] = True,       # Do you want to get information about memory?
+        # Output variables:
+    ) -> pd.DataFrame:                      # Preprocessed data with compact data types
+    # -- Get actual columns:
+    cat_cols = [col for col in set4compact.get('cat_cols') if col in df.columns]
+    flt_cols = [col for col in set4compact.get('flt_cols') if col in df.columns]
+    dat_cols = [col for col in set4compact.get('dat_cols') if col in df.columns]
+    # -- Change data types:
+    df_new = df.astype({col: 'category' for col in cat_cols})
+    for col in flt_cols:
+        values = df[col].astype('float32')
+        if np.allclose(values, df[col], rtol = set4compact.get('rtol'),
+                       atol = 0.0, equal_nan = True):
+            df_new[col] = values
+    for col in dat_cols:
+        df_new[col] = pd.to_datetime(df[col])
+    # -- Get information about memory:
+    if linfo == True:
+        lib4sys_support.get_memory_info(df, df_new, 'compact data')
+    return df_new
+# ------------------------------------------------------------------------------
+
+# -- get_data_cached --> Preprocessing of excel data with cache
+def get_data_cached(
+        # Input variables:
+        pin:str,                            # Excel file input paths
+        df_name:str,                        # Excel file names
+        set4excel:dict,                     # Excel file settings
+        pcache:str,                         # Path to the cache folder
+        linfo: Optional[bool] = True,       # Do you want to get more information about data?
+        # Output variables:
+    ) -> pd.DataFrame:                      # Preprocessed data collected in one dataframe
+    # -- Get key of the file (content, excel settings and preprocessing version),
+    #    content is hashed only if size or mtime are changed after last run:
+    fmeta = os.path.join(pcache, f'{df_name}.json')
+    old = None
+    if os.path.isfile(fmeta):
+        with open(fmeta) as f:
+            old = json.load(f)
+    meta = lib4sys_support.get_file_key(
+        pin, {'set4excel': set4excel, 'version': cache_version}, old)
+    fcache = os.path.join(pcache, f'{df_name}.{meta["key"][:20]}')
+    # -- Data is in cache:
+    if os.path.isfile(fcache + lib4sys_support.frame_format):
+        df = lib4sys_support.read_frame(fcache + lib4sys_support.frame_format)
+        if meta != old:
+            with open(fmeta, 'w') as f:
+                json.dump(meta, f)
+        if linfo == True:
+            lib4sys_support.get_info(df, df_name)
+        return df
+    # -- Data is not in cache or cache is old:
+    df = get_data(pin, df_name, set4excel, linfo = linfo)
+    lib4sys_support.makefolder(pcache)
+    for file in os.listdir(pcache):
+        if file.startswith(f'{df_name}.'):
+            os.remove(os.path.join(pcache, file))
+    lib4sys_support.save_frame(df, fcache)
+    with open(fmeta, 'w') as f:
+        json.dump(meta, f)
+    return df
+# ------------------------------------------------------------------------------
+
+# -- get_data_job --> Preprocessing of one excel file (task for process pool)
+def get_data_job(
+        # Input variables:
+        pin:str,                            # Excel file input paths
+        df_name:str,                        # Excel file names
+        set4excel:dict,                     # Excel file settings
+        pcache:Optional[str] = None,        # Path to the cache folder (None - without cache)
+        linfo: Optional[bool] = True,       # Do you want to get more information about data?
+        # Output variables:
+    ) -> tuple[pd.DataFrame, str]:          # Preprocessed data or error message
+    print(df_name)
+    try:
+        if pcache is None:
+            df = get_data(pin, df_name, set4excel, linfo = linfo)
+        else:
+            df = get_data_cached(pin, df_name, set4excel, pcache, linfo = linfo)
+        return df, None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+# ------------------------------------------------------------------------------
+
+# -- get_data_many --> Parallel preprocessing of excel data
+def get_data_many(
+        # Input variables:
+        ds_paths:list[str],                 # Excel file input paths
+        ds_names:list[str],                 # Excel file names
+        set4excel:dict,                     # Excel file settings
+        workers: Optional[int] = 1,         # Number of processes
+        pcache:Optional[str] = None,        # Path to the cache folder (None - without cache)
+        linfo: Optional[bool] = True,       # Do you want to get more information about data?
+        # Output variables:
+    ) -> tuple[list[pd.DataFrame],          # Preprocessed data (order of input files)
+               pd.DataFrame,                # Table with files which were not processed
+    ]:
+    # -- Preprocessing of all files:
+    results = lib4sys_support.run_parallel(
+        get_data_job,
+        [(pin, df_name, set4excel, pcache, linfo)
+            for pin, df_name in zip(ds_paths, ds_names)],
+        workers,
+    )
+    # -- Split results and errors:
+    lst4df = []
+    lst4err = []
+    for df_name, (df, err) in zip(ds_names, results):
+        if err is None:
+            lst4df.append(df)
+        else:
+            print(f'File {df_name} was not processed: {err}')
+            lst4err.append([df_name, err])
+    df_err = pd.DataFrame(lst4err, columns = ['excel_doc', 'error'])
+    return lst4df, df_err
+# ------------------------------------------------------------------------------
+
+# -- to_codes --> Get categorical codes of column (NaN for missing values) and
+#                 categories for back conversion
+def to_codes(
+        # Input variables:
+        col:pd.Series,                      # Column with repetitive values
+        # Output variables:
+    ) -> tuple[pd.Series, pd.Index]:        # Codes and categories of column
+    cat = col.astype('category')
+    codes = cat.cat.codes.astype('float64').where(cat.notna())
+    return codes, cat.cat.categories
+# ------------------------------------------------------------------------------
+
+# -- keys_index --> Index of grouped data with original data types of keys
+#                   (keys are grouped as categorical codes)
+def keys_index(
+        # Input variables:
+        index:pd.Index,                     # Index of grouped data
+        df:pd.DataFrame,                    # Research data
+        keys:list[str],                     # Columns for grouping
+        # Output variables:
+    ) -> pd.MultiIndex:                     # Index with original data types
+    return pd.MultiIndex.from_arrays(
+        [index.get_level_values(key).astype(df[key].dtype) for key in keys],
+        names = keys)
+# ------------------------------------------------------------------------------
+
+# -- unique_or_nan --> Get value of column if it is the same in the whole group,
+#                      otherwise NaN. Values are compared as categorical codes
+#                      (one groupby pass with numbers for all columns)
+def unique_or_nan(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data
+        keys:list[str],                     # Columns for grouping
+        cols:list[str],                     # Columns for aggregation
+        # Output variables:
+    ) -> pd.DataFrame:                      # Aggregated data
+    # -- Grouping keys and columns as categorical codes:
+    dct4codes = {col: to_codes(df[col]) for col in cols}
+    df_codes = pd.DataFrame(
+        {col: codes for col, (codes, cats) in dct4codes.items()}, index = df.index)
+    df_grp = df_codes.groupby(
+        [df[key].astype('category') for key in keys], observed = True)
+    df_first = df_grp.first().where(df_grp.nunique() == 1)
+    # -- Codes to values:
+    df_agg = pd.DataFrame(index = df_first.index)
+    for col, (codes, cats) in dct4codes.items():
+        lvalid = df_first[col].notna().to_numpy()
+        values = np.full(len(df_first), np.nan, dtype = object)
+        values[lvalid] = cats.take(df_first[col].to_numpy()[lvalid].astype('int64'))
+        df_agg[col] = values
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df_agg[col] = df_agg[col].astype(df[col].dtype)
+    df_agg.index = keys_index(df_agg.index, df, keys)
+    return df_agg
+# ------------------------------------------------------------------------------
+
 # -- select_data --> Select data based on parameter and get avarage values
 def select_data(
         # Input variables:
         df:pd.DataFrame,                    # Research data collected in one dataframe
-        param:str,                          # Research parameter (TIC or TOC)
+        param:Union[str, list[str]],        # Research parameter (TIC or TOC) or list of them
         # Output variables:
     ) -> pd.DataFrame:                      # Research data after processing
+    # -- Local variables:
+    keys = ['probenname', 'parameter']
     # -- Select data based on parameter:
-    var = param
-    df = df.query('parameter == @var').reset_index(drop = True)
-    # -- Settings for groupby method:
+    var = [param] if isinstance(param, str) else list(param)
+    df = df.query('parameter in @var').reset_index(drop = True)
+    # -- Settings for groupby method ('unique' - value if it is the same for
+    #    all values in group, otherwise NaN):
     dct = {
         'probenjahr': 'mean',
         'ergebnis'  : 'mean',
-        'einheit'   :  lambda col: col.mode() if col.nunique() == 1 else np.nan,
-        'vermuffelt':  lambda col: col.mode() if col.nunique() == 1 else np.nan,
-        'kommentar' :  lambda col: col.mode() if col.nunique() == 1 else np.nan,
+        'einheit'   : 'unique',
+        'vermuffelt': 'unique',
+        'kommentar' : 'unique',
         'probennahmedatum': 'mean',
-        'excel_doc' :  lambda col: col.mode() if col.nunique() == 1 else np.nan,
+        'excel_doc' : 'unique',
     }
-    # -- Groupby data:
-    df_agg = (
-        df.groupby(['probenname','parameter'])
-          .agg(**{k: (k, v) for k, v in dct.items()})
+    # -- Groupby data (keys as categorical codes):
+    df_grp = df.groupby([df[key].astype('category') for key in keys], observed = True)
+    df_mean = df_grp.agg(**{k: (k, v) for k, v in dct.items() if v != 'unique'})
+    df_mean.index = keys_index(df_mean.index, df, keys)
+    df_agg = pd.concat([
+        df_mean,
+        unique_or_nan(df, keys, [k for k, v in dct.items() if v == 'unique']),
+    ], axis = 1)
+    return df_agg.loc[:, list(dct)]
+# ------------------------------------------------------------------------------
+
+# -- get_agg_data --> Get average data for tic and toc experiments presented
+#                     for all experiments.
+def get_agg_data(
+        # Input variables:
+        df:pd.DataFrame,                    # Preprocessed data collected in one dataframe
+        params:Optional[list[str]] = None,  # Research parameters (default: tic and toc)
+        # Output variables:
+    ) -> pd.DataFrame:                      # Average data for all experiments
+    # -- Local variables:
+    params = ['tic', 'toc'] if params is None else params
+    sort_col = 'probenname'
+    keys = ['probenname', 'probenjahr', 'probennahmedatum']
+    param_cols = ['ergebnis', 'kommentar']
+    common_cols = ['einheit', 'vermuffelt', 'excel_doc']
+    # -- Average data for all parameters (one groupby) and put parameters to
+    #    columns. Data of parameters with different probenjahr or
+    #    probennahmedatum is presented in different lines:
+    df_wide = (
+        select_data(df, params)
+            .reset_index(level = 'parameter')
+            .reset_index(drop = False)
+            .set_index(keys + ['parameter'])
+            .unstack('parameter')
+            .reindex(columns = pd.MultiIndex.from_product(
+                [param_cols + common_cols, params]))
+    )
+    # -- Create output table (columns einheit, vermuffelt and excel_doc are
+    #    taken from the first parameter):
+    df_merge = pd.concat(
+        [df_wide.index.to_frame(index = False)] +
+        [df_wide[(col, prm)].rename(f'{col}_{prm}').reset_index(drop = True)
+            for col in param_cols for prm in params] +
+        [df_wide[(col, params[0])].rename(col).reset_index(drop = True)
+            for col in common_cols],
+        axis = 1,
+    ).rename(columns = {
+        'kommentar_tic' : 'kommentar_x',
+        'kommentar_toc' : 'kommentar_y',
+    })
+    # -- Reorder columns in dataframe and sort values by probenname:
+    cols = (
+        ['probenname', 'probenjahr'] +
+        [f'ergebnis_{prm}' for prm in params] +
+        [col for col in df_merge.columns if col.startswith('kommentar')] +
+        ['probennahmedatum'] + common_cols
+    )
+    df_merge = df_merge.loc[:, cols]
+    # -- Add structured sample id (it is the same for all lines of probenname):
+    if all(col in df.columns for col in id_cols):
+        df_merge = df_merge.merge(
+            df.loc[:, ['probenname'] + id_cols]
+              .drop_duplicates('probenname')
+              .astype({'exp': 'category', 'suffix': 'category'}),
+            on = 'probenname', how = 'left',
+        ).loc[:, ['probenname'] + id_cols + cols[1:]]
+    return (
+        df_merge.sort_values(sort_col, ascending = False)
+                .reset_index(drop = True)
     )
-    return df_agg
 # ------------------------------------------------------------------------------
 
-# -- get_exp_data --> Get average data for tic and toc experiments presented
-#                     for your experiment.
-def get_exp_data(
+# -- select_exp --> Split average data by experiments
+def select_exp(
         # Input variables:
-        list4df:list[pd.DataFrame],         # List of dataframes with preprocessed data.
+        df_agg:pd.DataFrame,                # Average data for all experiments
         mask:str,                           # Filter for searching data from your selected experiment.
         # Output variables:
     ) -> pd.DataFrame:                      # Data for your selected experiment
-    # -- Local variables:
-    tic_param = 'tic'
-    toc_param = 'toc'
-    sort_col = 'probenname'
-    merge_type = 'outer'
+    return (
+        df_agg.loc[df_agg.probenname.str.contains(mask), :]
+              .sort_values('probenname', ascending = True)
+              .reset_index(drop = True)
+    )
+# ------------------------------------------------------------------------------
+
+# -- get_exp_index --> Get index (lines) of all experiments in average data
+def get_exp_index(
+        # Input variables:
+        df_agg:pd.DataFrame,                # Average data for all experiments
+        # Output variables:
+    ) -> tuple[pd.DataFrame,                # Average data sorted by probenname
+               dict,                        # Lines of experiments (experiment code --> lines)
+    ]:
+    # -- Lines of one experiment are neighbours after sorting by probenname:
+    df_sort = (
+        df_agg.sort_values('probenname', ascending = True, kind = 'stable')
+              .reset_index(drop = True)
+    )
+    exp_index = {}
+    for code, lines in df_sort.groupby('exp', observed = True).indices.items():
+        if lines[-1] - lines[0] + 1 == len(lines):
+            exp_index[code] = slice(int(lines[0]), int(lines[-1]) + 1)
+        else:
+            exp_index[code] = lines
+    return df_sort, exp_index
+# ------------------------------------------------------------------------------
+
+# -- get_exp --> Get data for your experiment based on index of experiments
+def get_exp(
+        # Input variables:
+        df_sort:pd.DataFrame,               # Average data sorted by probenname
+        exp_index:dict,                     # Lines of experiments
+        exp:str,                            # Experiment code
+        # Output variables:
+    ) -> pd.DataFrame:                      # Data for your selected experiment
+    return df_sort.iloc[exp_index.get(exp, slice(0, 0))].reset_index(drop = True)
+# ------------------------------------------------------------------------------
+
+# -- get_all_data --> Get average data for tic and toc experiments presented
+#                     for all experiments.
+def get_all_data(
+        # Input variables:
+        list4df:list[pd.DataFrame],         # List of dataframes with preprocessed data.
+        lcompact: Optional[bool] = False,   # Do you want to use compact data types?
+        linfo: Optional[bool] = False,      # Do you want to get more information about data?
+        # Output variables:
+    ) -> pd.DataFrame:                      # Average data for all experiments
     # -- Get all data in one dataframe:
     df = (
         pd.concat(list4df, axis = 0)
           .reset_index(drop = True)
           .dropna(axis = 1, how = 'all')
     )
-    # -- Selected data based on parameters (tic and toc):
-    df_tic = (
-        select_data(df, tic_param)
-           .sort_values(sort_col, ascending = False)
-           .reset_index(drop = False)
+    if lcompact == True:
+        df = compact_data(df, linfo = linfo)
+    return get_agg_data(df)
+# ------------------------------------------------------------------------------
+
+# -- get_flags --> Check all rules in one pass. Result of every rule is saved
+#                  as one bit of flags (bit i - rule i)
+def get_flags(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data
+        rules:dict,                         # Rules {rule name : [column, operator, value]}
+        # Output variables:
+    ) -> np.ndarray:                        # Flags (0 - all rules are ok)
+    flags = np.zeros(len(df), dtype = 'int64')
+    for i, (col, op, value) in enumerate(rules.values()):
+        values = df[col].to_numpy()
+        with np.errstate(invalid = 'ignore'):
+            lbad = rule_ops.get(op)(values, value) & ~pd.isna(values)
+        flags |= lbad.astype('int64') << i
+    return flags
+# ------------------------------------------------------------------------------
+
+# -- flag_rows --> Add columns flags and reasons (names of broken rules)
+def flag_rows(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data
+        rules:dict,                         # Rules {rule name : [column, operator, value]}
+        flags:np.ndarray = None,            # Flags (if they are known)
+        # Output variables:
+    ) -> pd.DataFrame:                      # Research data with columns flags and reasons
+    if flags is None:
+        flags = get_flags(df, rules)
+    # -- Reasons are created only for unique values of flags:
+    names = list(rules)
+    reasons = {
+        flag : '; '.join(name for i, name in enumerate(names) if flag >> i & 1)
+        for flag in np.unique(flags)
+    }
+    return df.assign(
+        flags = flags,
+        reasons = pd.Series(flags, index = df.index).map(reasons),
     )
-    df_toc = (
-        select_data(df, toc_param)
-           .sort_values(sort_col, ascending = False)
-           .reset_index(drop = False)
+# ------------------------------------------------------------------------------
+
+# -- apply_rules --> Get data without problem rows and table with problem rows
+#                    (each row only once)
+def apply_rules(
+        # Input variables:
+        df:pd.DataFrame,                    # Research data
+        rules:dict,                         # Rules {rule name : [column, operator, value]}
+        # Output variables:
+    ) -> tuple[pd.DataFrame,               # Data without problem rows (and without
+                                            # missing values in columns of rules)
+               pd.DataFrame,               # Problem rows with flags and reasons
+    ]:
+    flags = get_flags(df, rules)
+    cols = list(dict.fromkeys(col for col, op, value in rules.values()))
+    lgood = (flags == 0) & df[cols].notna().all(axis = 1).to_numpy()
+    lbad  = flags != 0
+    return (df.loc[lgood],
+            flag_rows(df.loc[lbad], rules, flags[lbad]))
+# ------------------------------------------------------------------------------
+
+# -- get_exp_data --> Get average data for tic and toc experiments presented
+#                     for your experiment.
+def get_exp_data(
+        # Input variables:
+        list4df:list[pd.DataFrame],         # List of dataframes with preprocessed data.
+        mask:str,                           # Filter for searching data from your selected experiment.
+        lcompact: Optional[bool] = False,   # Do you want to use compact data types?
+        linfo: Optional[bool] = False,      # Do you want to get more information about data?
+        # Output variables:
+    ) -> pd.DataFrame:                      # Data for your selected experiment
+    #-- Split data by experiments
+    return select_exp(get_all_data(list4df, lcompact, linfo), mask)
+# ------------------------------------------------------------------------------
+
+# -- update_store --> Incremental update of preprocessed and average data. Only
+#                     new or changed excel files are read and only experiments
+#                     (probenname) from these files are averaged again.
+def update_store(
+        # Input variables:
+        ds_paths:list[str],                 # Excel file input paths
+        ds_names:list[str],                 # Excel file names
+        set4excel:dict,                     # Excel file settings
+        pstore:str,                         # Path to the folder with stored data
+        workers: Optional[int] = 1,         # Number of processes
+        lcompact: Optional[bool] = False,   # Do you want to use compact data types?
+        linfo: Optional[bool] = True,       # Do you want to get more information about data?
+        # Output variables:
+    ) -> tuple[pd.DataFrame,                # Average data for all experiments
+               pd.DataFrame,                # Table with files which were not processed
+    ]:
+    # -- Local variables:
+    fmt = lib4sys_support.frame_format
+    pmanifest = os.path.join(pstore, 'manifest')
+    pdata = os.path.join(pstore, 'data')
+    pagg = os.path.join(pstore, 'agg')
+    settings = {'set4excel': set4excel, 'version': cache_version}
+    # -- Read stored data (previous runs):
+    if all(os.path.isfile(path + fmt) for path in [pmanifest, pdata, pagg]):
+        df_manifest = lib4sys_support.read_frame(pmanifest + fmt)
+        df_data = lib4sys_support.read_frame(pdata + fmt)
+        df_agg = lib4sys_support.read_frame(pagg + fmt)
+    else:
+        df_manifest = pd.DataFrame(
+            columns = ['excel_doc', 'size', 'mtime', 'content', 'key'])
+        df_data = None
+        df_agg = None
+    # -- Get keys of actual files (content is hashed only for files with new
+    #    size or mtime):
+    dct4old = df_manifest.set_index('excel_doc').to_dict('index')
+    df_keys = pd.DataFrame([
+        {'excel_doc': name,
+         **lib4sys_support.get_file_key(pin, settings, dct4old.get(name))}
+        for pin, name in zip(ds_paths, ds_names)
+    ], columns = df_manifest.columns)
+    # -- Files which are new or changed (should be read) and files which were
+    #    changed or deleted (old data should be deleted):
+    lnew = ~df_keys.set_index(['excel_doc', 'key']).index.isin(
+        df_manifest.set_index(['excel_doc', 'key']).index)
+    lold = ~df_manifest.set_index(['excel_doc', 'key']).index.isin(
+        df_keys.set_index(['excel_doc', 'key']).index)
+    lst4new = df_keys.loc[lnew, 'excel_doc'].to_list()
+    lst4old = df_manifest.loc[lold, 'excel_doc'].to_list()
+    print(f'New or changed files: {len(lst4new)}, deleted or changed files: {len(lst4old)}')
+    # -- Get new data:
+    lst4df, df_err = get_data_many(
+        [ds_paths[ds_names.index(name)] for name in lst4new], lst4new,
+        set4excel, workers = workers, linfo = linfo,
     )
-    #-- Merge data
-    df_merge = df_tic.merge(
-        df_toc[['probenname', 'probennahmedatum', 'ergebnis',
-                'probenjahr', 'kommentar', 'parameter'       ]],
-        on  = ['probenname' , 'probennahmedatum', 'probenjahr'],
-        how = merge_type
+    lst4ok = [name for name in lst4new if name not in df_err['excel_doc'].to_list()]
+    # -- Update preprocessed data:
+    lst4touched = [df['probenname'] for df in lst4df]
+    if df_data is not None:
+        ldelete = df_data['excel_doc'].isin(lst4old + lst4new)
+        lst4touched.append(df_data.loc[ldelete, 'probenname'])
+        lst4df.insert(0, df_data.loc[~ldelete])
+    if len(lst4df) == 0:
+        sys.exit('There is no data for processing')
+    df_data = pd.concat(lst4df, axis = 0).reset_index(drop = True)
+    if lcompact == True:
+        df_data = compact_data(df_data, linfo = linfo)
+    touched = (
+        pd.concat(lst4touched).unique() if len(lst4touched) > 0 else []
     )
-    # -- if you want to use other data you can uncomment this line
-    #print(df_merge.columns, '\n')
-    df_merge = (
-        # -- Reorder columns in dataframe
-        df_merge.loc[:, [
-            'probenname' , 'probenjahr', 'parameter_x', 'ergebnis_x' ,
-            'parameter_y', 'ergebnis_y', 'kommentar_x', 'kommentar_y',
-            'probennahmedatum'         , 'einheit'    , 'vermuffelt' ,
-            'excel_doc']]
-        # -- Sort values by probenname
-                .sort_values(['probenname'], ascending = False)
-        # -- Reset index (drop = True - delete old columns with indexes)
-                .reset_index(drop=True)
-    #-- Rename columns
-    ).rename(columns = {
-        'ergebnis_x' : 'ergebnis_tic',
-        'ergebnis_y' : 'ergebnis_toc'
-        }
-    #-- Drop columns
-    ).drop(['parameter_x', 'parameter_y'], axis = 1)
-    #-- Split data by experiments
-    df_exp = (
-        df_merge.loc[df_merge.probenname.str.contains(mask), :]
-                .sort_values(sort_col, ascending = True)
-                .reset_index(drop = True)
+    # -- Update average data only for experiments from new and old files:
+    if df_agg is None:
+        df_agg = get_agg_data(df_data)
+    elif len(touched) > 0:
+        df_agg = df_agg.loc[~df_agg['probenname'].isin(touched)]
+        ltouched = df_data['probenname'].isin(touched)
+        if ltouched.any():
+            df_agg = pd.concat(
+                [df_agg, get_agg_data(df_data.loc[ltouched])], axis = 0)
+    df_agg = (
+        df_agg.sort_values('probenname', ascending = False)
+              .reset_index(drop = True)
     )
-    return df_exp
+    # -- Save data and manifest (files with errors will be read next time):
+    df_manifest = pd.concat([
+        df_manifest.loc[~df_manifest['excel_doc'].isin(lst4old + lst4new)],
+        df_keys.loc[df_keys['excel_doc'].isin(lst4ok)],
+    ], axis = 0).reset_index(drop = True)
+    lib4sys_support.makefolder(pstore)
+    lib4sys_support.save_frame(df_data, pdata)
+    lib4sys_support.save_frame(df_agg, pagg)
+    lib4sys_support.save_frame(df_manifest, pmanifest)
+    return df_agg, df_err
 # ------------------------------------------------------------------------------
 
 
@@ -280,52 +970,12 @@ def get_data4akanksha(
         linfo: Optional[bool] = True, # Do you want to get more information about your data?
         # Output variables:
         ) -> pd.DataFrame :           # Data after pre-processing
-    # -- Data types for columns:
-    flt4col = 'float'
-    dat4col = '%Y-%m-%d'
-    #-- Read data (excel file should have the same structure):
-    df = pd.read_excel(
-        pin,
-        sheet_name = set4excel.get('sheet_name'),
-        skiprows   = set4excel.get('skiprows'),
-        header     = set4excel.get('header'),
-    )
-    # -- Get first information about data:
-    if linfo == True:
-        lib4sys_support.get_info(df, df_name)
-    # -- Rename colums (all columns name should be in one register):
-    for col in df.columns.to_list():
-        df = df.rename(columns={col : col.lower()})
-    # -- Change data types for columns (if it is needed):  
-    # -- a. In columns probenjahr and nummer change type int64 to str.
-    #       Create new column analysis_nummer based on them:
-    df['probenjahr'] = df['probenjahr'].astype(str)
-    df['nummer'] = df['nummer'].astype(str)
+    #-- Read data. Columns get data types, time format and register from
+    #   schema, spaces are deleted from probenname and kommentar:
+    df = read_excel_schema(pin, set4excel, schema4akanksha, df_name, linfo)
+    # -- Create new column analysis_nummer based on probenjahr and nummer:
     df['analysis_nummer'] = df.probenjahr.str.cat(df.nummer, sep='_')
-    # -- b. In columns: change ergebnis type from type object to float:
-    #   Important: Check why we have text in this column!!!!
-    def check_data(row):
-        return isinstance(row['ergebnis'], float)
-    df['lcheck'] = df.apply(check_data, axis = 1)
-    df = (df.loc[df.loc[:,'lcheck'] == True]
-            .drop('lcheck', axis = 1)
-    )
-    df['ergebnis'] = df['ergebnis'].astype(flt4col)
-    # -- c. Change time format in messdatum and probennahmedatum columns:
-    df['messdatum'] = pd.to_datetime(df['messdatum'], format = dat4col)
-    df['probennahmedatum'] = pd.to_datetime(df['probennahmedatum'], format = dat4col)
-    # -- d. Delete space from probennamen:
-    def space(row):
-        return row['probenname'].replace(" ", "")
-    df['probenname'] = df.apply(space, axis = 1)
-    # -- e. Change register for all columns with object type
-    for col in df.loc[:, df.dtypes == object]:
-        df[col] = df[col].str.lower()
     # -- Get information from "kommentar'
-    # -- a. Delete spaces:
-    def space(row):
-        return row['kommentar'].replace(" ", "")
-    df['kommentar'] = df.apply(space, axis = 1)
     # -- b. Get new column 'plot':
     df['plot'] = (
         df['kommentar'].str.split(r"/", expand = True).loc[:,[0]].rename(columns = {0 : 'plot'})
@@ -352,9 +1002,7 @@ def get_data4akanksha(
         )
     except KeyError:
         print('In dataset (field - kommentar) there is no data with simbol ;')
-        def nan_data(row):
-            return 'ndata'
-        df['kommentar'] = df.apply(nan_data, axis = 1)
+        df['kommentar'] = 'ndata'
     # -- Select data which we want to use:
     df_final = (
         df.loc[:, [
@@ -365,42 +1013,276 @@ def get_data4akanksha(
         ]
     )
     # -- Add additional column with excel file name:
-    exp_name = (
-        pd.Series(np.nan, index = df.index)
-          .replace(np.nan, df_name)
-          .rename('excel_doc')
-    )
-    # -- Add new column to dataframe:
-    df_final = pd.concat([df_final, exp_name], axis = 1)
+    df_final['excel_doc'] = df_name
     return df_final
 
 
-def get_complex_plot_data(
+# -- get_agg_spec --> Get aggregates for all columns of meteo data
+def get_agg_spec(
         # Input variables:
-        df:pd.DataFrame,                    # Input data from meteostation
-        uset4data:dict,                     # User parameters for dataset
+        cols:list[str],                     # Column names
+        dct4agg:dict = None,                # Aggregates {pattern of column name : aggregates}
+        default:str = agg_default,          # Aggregate for other columns
         # Output variables:
-    ) -> tuple[pd.DataFrame,               # T2m data
-               pd.DataFrame,               # Precipitation data
-               pd.DataFrame,               # Soil moisture data
-    ]:
-    # -- Local variables:
-    t1 = uset4data.get('tstart')
-    t2 = uset4data.get('tstop')
-    depth = uset4data.get('levels')
-    t2m_col = uset4data.get('t2m_col')
-    prec_col = uset4data.get('prec_col')
-    sm_cols  = uset4data.get('sm_cols')
-
-    # -- Reset time intex and take columns only with soil moisture:
-    df['time'] = pd.to_datetime(df['time']).dt.date
-    # -- Get data:
-    df_temp = df.set_index('time')[t2m_col][t1:t2]
-    df_prec = df.set_index('time')[prec_col][t1:t2]
-    df_soil = df.set_index('time')[sm_cols][t1:t2].T
+    ) -> dict:                              # Aggregates {column name : aggregates}
+    if dct4agg is None:
+        dct4agg = set4resample
+    dct4spec = {}
+    for col in cols:
+        aggs = [default]
+        for pattern, lst4agg in dct4agg.items():
+            if match(pattern, col):
+                aggs = list(lst4agg)
+                break
+        dct4spec[col] = aggs
+    return dct4spec
+# ------------------------------------------------------------------------------
+
+# -- agg_name --> Get column name of additional aggregate: 'T (degC)' --> 'T_min (degC)'
+def agg_name(
+        # Input variables:
+        col:str,                            # Column name (parameter (unit))
+        agg:str,                            # Aggregate
+        # Output variables:
+    ) -> str:                               # Column name of aggregate
+    param, sep, unit = col.partition(' (')
+    if agg == 'count':
+        return f'{param}_{agg} (-)'
+    return f'{param}_{agg}{sep}{unit}'
+# ------------------------------------------------------------------------------
+
+# -- resample_data --> Resample meteo data. Time bins are calculated once, each
+#                      aggregate is calculated for all its columns in one step
+def resample_data(
+        # Input variables:
+        df:pd.DataFrame,                    # Meteo data (index - time)
+        freq:str = 'day',                   # Frequency (key of set4freq or pandas frequency)
+        dct4agg:dict = None,                # Aggregates {pattern of column name : aggregates}
+        # Output variables:
+    ) -> pd.DataFrame:                      # Resampled data (index - time, begin of bin)
+    dct4spec = get_agg_spec(df.columns, dct4agg)
+    # -- Columns of aggregates (sums need number of valid values, bins
+    #    without data get NaN, not 0):
+    dct4cols = {}
+    for col, aggs in dct4spec.items():
+        if 'sum' in aggs and 'count' not in aggs:
+            aggs = aggs + ['count']
+        for agg in aggs:
+            dct4cols.setdefault(agg, []).append(col)
+    resampler = df.resample(
+        set4freq.get(freq, freq), closed = 'left', label = 'left')
+    dct4agg_data = {
+        agg : resampler[cols].agg(agg) for agg, cols in dct4cols.items()
+    }
+    dct4res = {}
+    for col, aggs in dct4spec.items():
+        for i, agg in enumerate(aggs):
+            values = dct4agg_data[agg][col]
+            if agg == 'sum':
+                values = values.where(dct4agg_data['count'][col] > 0)
+            dct4res[col if i == 0 else agg_name(col, agg)] = values
+    return pd.DataFrame(dct4res)
+# ------------------------------------------------------------------------------
+
+
+# -- get_pyramid --> Get all levels of resolution pyramid for raw meteo data
+def get_pyramid(
+        # Input variables:
+        df:pd.DataFrame,                    # Raw 10 minutes data (index - time)
+        dct4agg:dict = None,                # Aggregates {pattern of column name : aggregates}
+        # Output variables:
+    ) -> dict:                              # Data of levels {level : dataframe}
+    return {
+        level : df if freq is None else resample_data(df, freq, dct4agg)
+        for level, freq in pyramid_levels.items()
+    }
+# ------------------------------------------------------------------------------
+
+# -- archive_path --> Get path of partition in station archive (without extension)
+def archive_path(
+        # Input variables:
+        path:str,                           # Folder with archive
+        station:str,                        # Station name
+        level:str,                          # Level of pyramid
+        period:pd.Period = None,            # Period of partition (None - all data)
+        # Output variables:
+    ) -> str:                               # Path without extension
+    if period is None:
+        return f'{path}/{station}/{level}/all'
+    if period.freqstr.startswith('Y'):
+        return f'{path}/{station}/{level}/{period.year}'
+    return f'{path}/{station}/{level}/{period.year}/{period.month:02d}'
+# ------------------------------------------------------------------------------
+
+# -- save_archive --> Save data of station in archive (one file for each partition).
+#                    Old partitions of station and level are deleted
+def save_archive(
+        # Input variables:
+        df:pd.DataFrame,                    # Data (index - time)
+        pout:str,                           # Folder with archive
+        station:str,                        # Station name
+        level:str = '10min',                # Level of pyramid
+        # Output variables:
+    ) -> list[str]:                         # Output paths
+    folder = f'{pout}/{station}/{level}'
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    part = archive_parts.get(level)
+    if part is None:
+        os.makedirs(folder)
+        return [lib4sys_support.save_frame(df, archive_path(pout, station, level))]
+    lst4out = []
+    for period, df_part in df.groupby(df.index.to_period(part), sort = False):
+        fout = archive_path(pout, station, level, period)
+        os.makedirs(os.path.dirname(fout), exist_ok = True)
+        lst4out.append(lib4sys_support.save_frame(df_part, fout))
+    return lst4out
+# ------------------------------------------------------------------------------
+
+# -- time_stop --> Get end of time window: date without time (midnight) is the
+#                  whole day, for example '2023-06-30' --> '2023-06-30 23:59:59.999999999'
+def time_stop(
+        # Input variables:
+        t2:pd.Timestamp,                    # End of time window (date or time)
+        # Output variables:
+    ) -> pd.Timestamp:                      # End of time window (inclusive)
+    t2 = pd.Timestamp(t2)
+    if t2 == t2.normalize():
+        return t2 + pd.Timedelta(days = 1) - pd.Timedelta(1, unit = 'ns')
+    return t2
+# ------------------------------------------------------------------------------
+
+# -- read_archive --> Read data of time window from station archive. Only files
+#                     of partitions in time window and selected columns are read
+def read_archive(
+        # Input variables:
+        pin:str,                            # Folder with archive
+        station:str,                        # Station name
+        t1:pd.Timestamp,                    # Begin of time window
+        t2:pd.Timestamp,                    # End of time window
+        columns:list[str] = None,           # Columns (None - all columns)
+        level:str = '10min',                # Level of pyramid
+        # Output variables:
+    ) -> pd.DataFrame:                      # Data of time window (index - time)
+    part = archive_parts.get(level)
+    if part is None:
+        lst4paths = [archive_path(pin, station, level)]
+    else:
+        lst4paths = [archive_path(pin, station, level, period)
+                     for period in pd.period_range(t1, time_stop(t2), freq = part)]
+    lst4df = [
+        lib4sys_support.read_frame(path + lib4sys_support.frame_format, columns)
+        for path in lst4paths
+        if os.path.exists(path + lib4sys_support.frame_format)
+    ]
+    if len(lst4df) == 0:
+        raise FileNotFoundError(f'No data of {station} ({level}) in {pin}')
+    df = lst4df[0] if len(lst4df) == 1 else pd.concat(lst4df, axis = 0)
+    return df.loc[t1:time_stop(t2)]
+# ------------------------------------------------------------------------------
+
+# -- save_pyramid --> Save all levels of resolution pyramid in station archive
+def save_pyramid(
+        # Input variables:
+        dct4levels:dict,                    # Data of levels {level : dataframe}
+        pout:str,                           # Folder with archive
+        station:str,                        # Station name
+        # Output variables:
+    ) -> list[str]:                         # Output paths
+    return [
+        path for level, df in dct4levels.items()
+             for path in save_archive(df, pout, station, level)
+    ]
+# ------------------------------------------------------------------------------
+
+# -- pyramid_level --> Get the coarsest level with enough points in time window
+def pyramid_level(
+        # Input variables:
+        t1:pd.Timestamp,                    # Begin of time window
+        t2:pd.Timestamp,                    # End of time window
+        npoints:int,                        # Minimal number of points (for example
+                                            # width of figure in pixels)
+        # Output variables:
+    ) -> str:                               # Level of pyramid
+    # -- Number of points is calculated by time step (without time series):
+    duration = pd.Timestamp(t2) - pd.Timestamp(t1)
+    for level in reversed(pyramid_levels):
+        if duration / pd.Timedelta(pyramid_steps.get(level)) + 1 >= npoints:
+            return level
+    return next(iter(pyramid_levels))
+# ------------------------------------------------------------------------------
+
+# -- read_pyramid --> Read data of time window from resolution pyramid
+def read_pyramid(
+        # Input variables:
+        pin:str,                            # Folder with archive
+        station:str,                        # Station name
+        t1:pd.Timestamp,                    # Begin of time window
+        t2:pd.Timestamp,                    # End of time window
+        npoints:int = 1000,                 # Minimal number of points
+        level:str = None,                   # Level of pyramid (None - get it by npoints)
+        columns:list[str] = None,           # Columns (None - all columns)
+        # Output variables:
+    ) -> pd.DataFrame:                      # Data of time window (index - time)
+    if level is None:
+        level = pyramid_level(t1, t2, npoints)
+    return read_archive(pin, station, t1, t2, columns, level)
+# ------------------------------------------------------------------------------
+
+
+# -- StationSeries --> Data of one station with sorted time index. Time windows
+#                     are found by binary search, columns are selected only in
+#                     time window (data of station is not copied)
+class StationSeries:
+    def __init__(self, df, station = ''):
+        # -- Time index (old tables have column time), data of caller is not
+        #    changed:
+        if 'time' in df.columns:
+            df = df.set_index('time')
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df = df.set_axis(
+                pd.DatetimeIndex(pd.to_datetime(df.index), name = 'time'), axis = 0)
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        self.station = station    # Station name
+        self.data    = df         # Data of station (index - time)
+
+
+    @classmethod
+    def from_archive(cls, pin, station, t1, t2, level = 'day', columns = None):
+        """Load station from station archive (read_archive)"""
+        return cls(read_archive(pin, station, t1, t2, columns, level), station)
+
+
+    def bounds(self, t1 = None, t2 = None):
+        """Positions of time window [t1, t2] (binary search, date t2 - whole day)"""
+        index = self.data.index
+        i1 = 0 if t1 is None else index.searchsorted(pd.Timestamp(t1), side = 'left')
+        i2 = len(index) if t2 is None else index.searchsorted(time_stop(t2), side = 'right')
+        return i1, i2
+
+
+    def slice(self, t1 = None, t2 = None, columns = None):
+        """Data of time window [t1, t2] and columns (None - all columns)"""
+        i1, i2 = self.bounds(t1, t2)
+        df = self.data.iloc[i1:i2]
+        return df if columns is None else df[columns]
+
+
+# -- soil_profiles --> Soil moisture profiles (index - depth, columns - dates)
+def soil_profiles(
+        # Input variables:
+        data:StationSeries,                 # Input data from meteostation
+        t1:pd.Timestamp,                    # Begin of time window
+        t2:pd.Timestamp,                    # End of time window
+        sm_cols:list[str],                  # Soil moisture columns
+        depth:list[float],                  # Depth of soil moisture columns
+        # Output variables:
+    ) -> pd.DataFrame:                      # Soil moisture profiles
+    df_soil = data.slice(t1, t2, sm_cols).T
+    df_soil.columns = df_soil.columns.date
     df_soil['depth'] = depth
-    df_soil = df_soil.reset_index(drop = True).set_index('depth')
-    return df_temp, df_prec, df_soil
+    return df_soil.reset_index(drop = True).set_index('depth')
 
 
 def str_filter(
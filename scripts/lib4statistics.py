@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Module with statistics for TIC and TOC data. Statistics is
+             calculated for all experiments and data variants (without and
+             with filters) in one pass:
+    1. get_stats      --> descriptive statistics and regression (tic vs toc)
+    2. get_regression --> regression parameters for one experiment and variant
+    3. update_stats   --> merge statistics with statistics of previous runs
+    4. save_stats     --> save statistics in one file (excel) or in 2 files
+
+Authors: Evgenii Churiulin
+
+Current Code Owner: MPI-BGC, Evgenii Churiulin
+phone:  +49  170 261-5104
+email:  evgenychur@bgc-jena.mpg.de
+
+History:
+Version    Date       Name
+---------- ---------- ----
+    1.1    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Initial release
+    1.2    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Statistics is saved with l4s.write_tables
+    1.3    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Groups without data (both values) get NaN statistics
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Fast default format of tables (l4s.table_format)
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Statistics of previous runs are merged by experiment (update_stats)
+"""
+# =============================     Import modules     =====================
+import numpy as np
+import pandas as pd
+from scipy import stats
+# Personal:
+import lib4sys_support as l4s
+
+# -- Names of levels (experiment id and data variant):
+lvl4stats = ['exp', 'variant']
+# =============================   Personal functions   =====================
+
+# -- describe_stats --> Get descriptive statistics (the same as in describe)
+def describe_stats(
+        # Input variables:
+        df:pd.DataFrame,                  # Data of all groups (index - exp, variant, row)
+        cols:list[str],                   # Columns for statistics
+        # Output variables:
+    ) -> pd.DataFrame:                    # Statistics (index - exp, variant)
+    grp = df[cols].groupby(level = lvl4stats, sort = False)
+    df_base = grp.agg(['count', 'mean', 'std', 'min', 'max'])
+    df_qnt = grp.quantile([0.25, 0.50, 0.75]).unstack()
+    df_qnt.columns = pd.MultiIndex.from_tuples(
+        [(col, f'{q:.0%}') for col, q in df_qnt.columns])
+    # -- Order of statistics like in describe:
+    order = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+    return pd.concat([df_base, df_qnt], axis = 1)[
+        [(col, stat) for col in cols for stat in order]]
+
+# -- regression_stats --> Get linear regression (the same as in stats.linregress)
+def regression_stats(
+        # Input variables:
+        df:pd.DataFrame,                  # Data of all groups (index - exp, variant, row)
+        x:str,                            # Column name (independent variable)
+        y:str,                            # Column name (dependent variable)
+        # Output variables:
+    ) -> pd.DataFrame:                    # Regression parameters (index - exp, variant)
+    # -- Only rows with both values:
+    df = df.loc[df[x].notna() & df[y].notna(), [x, y]]
+    grp = df.groupby(level = lvl4stats, sort = False)
+    mean = grp.transform('mean')
+    dx = df[x] - mean[x]
+    dy = df[y] - mean[y]
+    df_sum = (
+        pd.DataFrame({'xx' : dx * dx, 'yy' : dy * dy, 'xy' : dx * dy})
+            .groupby(level = lvl4stats, sort = False)
+            .sum()
+    )
+    n = grp[x].count()
+    xmean = grp[x].mean()
+    ymean = grp[y].mean()
+    ssxm  = df_sum['xx'] / n
+    ssym  = df_sum['yy'] / n
+    ssxym = df_sum['xy'] / n
+    # -- Regression parameters:
+    r = (ssxym / np.sqrt(ssxm * ssym)).clip(-1.0, 1.0)
+    slope = ssxym / ssxm
+    intercept = ymean - slope * xmean
+    dof = n - 2
+    tiny = 1.0e-20
+    t = r * np.sqrt(dof / ((1.0 - r + tiny) * (1.0 + r + tiny)))
+    p = pd.Series(2 * stats.t.sf(np.abs(t), dof), index = r.index)
+    stderr = np.sqrt((1 - r**2) * ssym / ssxm / dof)
+    return pd.DataFrame({
+        'n'                : n,
+        'slope'            : slope,
+        'intercept'        : intercept,
+        'r_value'          : r,
+        'p_value'          : p,
+        'std_err'          : stderr,
+        'intercept_stderr' : stderr * np.sqrt(ssxm + xmean**2),
+    })
+
+# -- get_stats --> Get descriptive statistics and regression for all groups
+def get_stats(
+        # Input variables:
+        dct4data:dict,                    # Data {(exp, variant) : dataframe}
+        cols:list[str] = None,            # Columns for statistics (x, y, ...)
+        # Output variables:
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:  # Descriptive statistics, regression
+    if cols is None:
+        cols = ['ergebnis_tic', 'ergebnis_toc']
+    df = pd.concat(
+        {key : df[cols] for key, df in dct4data.items()},
+        names = lvl4stats + ['row'],
+    )
+    # -- Statistics for all groups (groups without data get NaN, n = 0):
+    index = pd.MultiIndex.from_tuples(list(dct4data), names = lvl4stats)
+    df_desc = describe_stats(df, cols).reindex(index)
+    df_reg  = regression_stats(df, cols[0], cols[1]).reindex(index)
+    df_reg['n'] = df_reg['n'].fillna(0).astype('int64')
+    return df_desc, df_reg
+
+# -- get_regression --> Get regression parameters for experiment and variant
+def get_regression(
+        # Input variables:
+        df_reg:pd.DataFrame,              # Regression parameters (get_stats)
+        exp:str,                          # Experiment id
+        variant:str,                      # Data variant
+        # Output variables:
+    ) -> dict:                            # Regression parameters (NaN - no data)
+    if (exp, variant) not in df_reg.index:
+        return {col : np.nan for col in df_reg.columns}
+    return df_reg.loc[(exp, variant)].to_dict()
+
+# -- update_stats --> Merge statistics with statistics of previous runs (rows of
+#                     experiments from new statistics are replaced)
+def update_stats(
+        # Input variables:
+        df:pd.DataFrame,                  # New statistics (index - exp, variant)
+        df_old:pd.DataFrame = None,       # Statistics of previous runs (saved table)
+        # Output variables:
+    ) -> pd.DataFrame:                    # Statistics of all experiments (flat table)
+    df = l4s.flat_table(df)
+    if df_old is None:
+        return df
+    df_old = df_old.loc[~df_old[lvl4stats[0]].isin(df[lvl4stats[0]])]
+    return (
+        pd.concat([df_old, df], axis = 0, ignore_index = True)
+          .sort_values(lvl4stats[0], kind = 'stable')
+          .reset_index(drop = True)
+    )
+
+# -- save_stats --> Save statistics (excel - one file with 2 sheets)
+def save_stats(
+        # Input variables:
+        df_desc:pd.DataFrame,             # Descriptive statistics
+        df_reg:pd.DataFrame,              # Regression parameters
+        pout:str,                         # Output path (without extension)
+        form:str = l4s.table_format,      # Output format
+        # Output variables:
+    ) -> list[str]:                       # Output paths
+    return l4s.write_tables(
+        {'describe' : df_desc, 'regression' : df_reg}, pout, form)
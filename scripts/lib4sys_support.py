@@ -17,11 +17,45 @@ Version    Date       Name
            Add new function 3.
     1.2    07.06.2023 Evgenii Churiulin, MPI-BGC
            Code refactoring
+    1.3    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add functions for file keys and columnar storage of dataframes
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add function for parallel calculations
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add memory report for datasets
+    1.6    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add writers and readers for output tables (xlsx, csv, parquet,
+           feather)
+    1.7    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Read only selected columns of saved dataframes
+    1.8    18.10.2026 Evgenii Churiulin, MPI-BGC
+           File content is hashed only if size or mtime of file are changed
+    1.9    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Update of existing excel file, fast default format of tables
+    1.10   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Old tables are replaced in the same way for all formats, tables
+           of run can be deleted (drop)
 """
 
 # =============================     Import modules     =================
 import os
+import re
+import json
+import hashlib
+from importlib.util import find_spec
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+
+# -- Columnar format for intermediate data (parquet needs pyarrow, otherwise
+#    pickle is used):
+frame_format = '.parquet' if find_spec('pyarrow') is not None else '.pkl'
+# -- Formats of output tables and max number of rows in excel sheet:
+table_formats = ['.xlsx', '.csv', '.parquet', '.feather']
+xlsx_rows = 1048576
+# -- Default format of output tables (fast format, excel is much slower for big
+#    tables, for example 260k rows x 20 columns: xlsx - 63 s, csv - 9 s,
+#    parquet - 0.7 s, feather - 0.1 s):
+table_format = '.parquet' if find_spec('pyarrow') is not None else '.csv'
 # =============================   Personal functions   =================
 # -- dep_clean --> Cleaning previous results
 def dep_clean(
@@ -62,3 +96,273 @@ def get_info(
     print(df.isnull().sum())
     print(f'Numbers of duplicates (explicit)in the dataset - {df_name}', '\n')
     print(df.duplicated().sum())
+
+
+# get_memory_info --> Compare memory usage of datasets (bytes per column)
+def get_memory_info(
+        # Input variables:
+        df_old:pd.DataFrame,    # Research dataframe before changes
+        df_new:pd.DataFrame,    # Research dataframe after changes
+        df_name:str,            # Name of the research dataset
+        # Output variables:
+    ):                          # Print information about dataset in command window
+    df_mem = pd.concat([
+        df_old.memory_usage(index = False, deep = True).rename('before'),
+        df_new.memory_usage(index = False, deep = True).rename('after'),
+    ], axis = 1)
+    df_mem.loc['total'] = df_mem.sum()
+    print(f'Memory usage (bytes) in the dataset - {df_name}', '\n')
+    print(df_mem, '\n')
+
+# get_file_stat --> Get size and modification time of file
+def get_file_stat(
+        # Input variables:
+        path:str,               # Path to the file
+        # Output variables:
+    ) -> dict:                  # Size (bytes) and modification time (ns)
+    stat = os.stat(path)
+    return {'size' : stat.st_size, 'mtime' : stat.st_mtime_ns}
+
+# get_file_hash --> Get hash of file content
+def get_file_hash(
+        # Input variables:
+        path:str,               # Path to the file
+        # Output variables:
+    ) -> str:                   # Hash of content (sha256)
+    # -- Local variables:
+    chunk = 1024 * 1024
+    # -- Get content hash:
+    content = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            content.update(block)
+    return content.hexdigest()
+
+# get_file_key --> Get unique key for file (content and settings). Content is
+#                  hashed only if size or mtime differ from previous run (old)
+def get_file_key(
+        # Input variables:
+        path:str,               # Path to the file
+        settings:dict = None,   # Additional settings which influence result
+        old:dict = None,        # Metainformation of file from previous run
+        # Output variables:
+    ) -> dict:                  # Size, mtime, content hash and key (sha256)
+    # -- Get file metainformation:
+    meta = get_file_stat(path)
+    if (old is not None and isinstance(old.get('content'), str) and
+        old.get('size') == meta['size'] and old.get('mtime') == meta['mtime']):
+        meta['content'] = old['content']
+    else:
+        meta['content'] = get_file_hash(path)
+    meta['key'] = hashlib.sha256(
+        json.dumps({'content' : meta['content'], 'settings' : settings},
+                   sort_keys = True, default = str).encode()
+    ).hexdigest()
+    return meta
+
+# save_frame --> Save dataframe in columnar format
+def save_frame(
+        # Input variables:
+        df:pd.DataFrame,        # Research dataframe
+        pout:str,               # Output path without extension
+        # Output variables:
+    ) -> str:                   # Output path with extension
+    fout = pout + frame_format
+    if frame_format == '.parquet':
+        df.to_parquet(fout)
+    else:
+        df.to_pickle(fout)
+    return fout
+
+# read_frame --> Read dataframe saved by save_frame
+def read_frame(
+        # Input variables:
+        pin:str,                # Input path with extension
+        columns:list = None,    # Columns (None - all columns)
+        # Output variables:
+    ) -> pd.DataFrame:          # Research dataframe
+    if pin.endswith('.parquet'):
+        return pd.read_parquet(pin, columns = columns)
+    df = pd.read_pickle(pin)
+    return df if columns is None else df[columns]
+
+# run_parallel --> Run function for each set of arguments in a process pool
+def run_parallel(
+        # Input variables:
+        func,                   # Function (should be defined at module level)
+        lst4args:list[tuple],   # List with arguments for each function call
+        workers:int = 1,        # Number of processes (1 - without process pool)
+        # Output variables:
+    ) -> list:                  # Results in the same order as lst4args
+    if workers is None or workers <= 1 or len(lst4args) <= 1:
+        return [func(*args) for args in lst4args]
+    with ProcessPoolExecutor(max_workers = min(workers, len(lst4args))) as pool:
+        return list(pool.map(func, *zip(*lst4args)))
+
+# flat_table --> Prepare dataframe for output table (index as columns,
+#                column names as strings)
+def flat_table(
+        # Input variables:
+        df:pd.DataFrame,        # Research dataframe
+        # Output variables:
+    ) -> pd.DataFrame:          # Dataframe with default index
+    if not df.index.equals(pd.RangeIndex(len(df))) or df.index.name is not None:
+        df = df.reset_index()
+    else:
+        df = df.copy(deep = False)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ['_'.join(str(lvl) for lvl in col if str(lvl) != '')
+                      for col in df.columns]
+    else:
+        df.columns = [str(col) for col in df.columns]
+    return df
+
+# write_xlsx --> Write tables in one excel file (streaming, constant memory)
+def write_xlsx(
+        # Input variables:
+        dct4tables:dict,        # Tables {sheet name : dataframe}
+        fout:str,               # Output path with extension
+        # Output variables:
+    ):                          # Create excel file
+    if find_spec('xlsxwriter') is None:
+        with pd.ExcelWriter(fout) as writer:
+            for name, df in dct4tables.items():
+                flat_table(df).to_excel(writer, sheet_name = name[:31], index = False)
+        return
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(fout, {
+        'constant_memory'     : True,
+        'default_date_format' : 'yyyy-mm-dd hh:mm:ss',
+        'remove_timezone'     : True,
+        'strings_to_urls'     : False,
+    })
+    for name, df in dct4tables.items():
+        df = flat_table(df)
+        # -- Big tables are splitted to several sheets (excel limit):
+        nrows = xlsx_rows - 1
+        for k, first in enumerate(range(0, max(len(df), 1), nrows)):
+            sheet = workbook.add_worksheet(name[:31] if k == 0 else f'{name[:27]}_{k}')
+            sheet.write_row(0, 0, list(df.columns))
+            part = df.iloc[first:first + nrows].astype(object)
+            part = part.where(part.notna(), None)
+            # -- Rows are written one by one (row by row in constant memory mode):
+            for i, row in enumerate(part.itertuples(index = False, name = None), 1):
+                sheet.write_row(i, 0, row)
+    workbook.close()
+
+# is_sheet_of --> Check that excel sheet belongs to table (big tables are
+#                 splitted to several sheets in write_xlsx)
+def is_sheet_of(
+        # Input variables:
+        sheet:str,              # Sheet name
+        name:str,               # Table name
+        # Output variables:
+    ) -> bool:                  # True - sheet is a part of table
+    return (sheet == name[:31] or
+            re.fullmatch(re.escape(name[:27]) + r'_\d+', sheet) is not None)
+
+# table_names --> Get names of tables saved by write_tables (sheets of excel file)
+def table_names(
+        # Input variables:
+        pin:str,                # Input path without extension (as in write_tables)
+        form:str = table_format, # Input format
+        # Output variables:
+    ) -> list[str]:             # Table names (empty - no tables)
+    if form == '.xlsx':
+        if not os.path.exists(pin + form):
+            return []
+        with pd.ExcelFile(pin + form) as xlsx:
+            return list(xlsx.sheet_names)
+    folder, prefix = os.path.split(pin + '_')
+    if not os.path.isdir(folder or '.'):
+        return []
+    return [
+        file[len(prefix):-len(form)] for file in sorted(os.listdir(folder or '.'))
+        if file.startswith(prefix) and file.endswith(form)
+    ]
+
+# write_tables --> Write tables in output format (.xlsx - one file with sheets,
+#                  .csv, .parquet, .feather - one file for each table). Both
+#                  variants replace or keep old tables in the same way:
+#                  lupdate = False - all old tables are deleted, lupdate = True -
+#                  only old tables with the same names (and tables from drop)
+#                  are replaced (deleted)
+def write_tables(
+        # Input variables:
+        dct4tables:dict,        # Tables {table name : dataframe}
+        pout:str,               # Output path without extension
+        form:str = table_format, # Output format
+        lupdate:bool = False,   # Keep other tables of previous runs?
+        drop:list[str] = None,  # Old tables which are deleted in any case (tables
+                                # of run, for example errors)
+        # Output variables:
+    ) -> list[str]:             # Output paths
+    if form not in table_formats:
+        raise ValueError(f'Output format {form} is not supported: {table_formats}')
+    # -- Old tables which have to be deleted:
+    lst4new = list(dct4tables) + list(drop or [])
+    lst4all = table_names(pout, form)
+    lst4old = [
+        name for name in lst4all
+        if lupdate is False or
+           (form == '.xlsx' and any(is_sheet_of(name, new) for new in lst4new)) or
+           name in lst4new
+    ]
+    if form == '.xlsx':
+        if len(lst4old) < len(lst4all):
+            dct4tables = {
+                **{name : df for name, df in read_tables(pout, form).items()
+                   if name not in lst4old},
+                **dct4tables,
+            }
+        write_xlsx(dct4tables, pout + form)
+        return [pout + form]
+    for name in lst4old:
+        os.remove(f'{pout}_{name}{form}')
+    lst4out = []
+    for name, df in dct4tables.items():
+        fout = f'{pout}_{name}{form}'
+        df = flat_table(df)
+        if form == '.csv':
+            df.to_csv(fout, index = False)
+        elif form == '.parquet':
+            df.to_parquet(fout, index = False)
+        elif form == '.feather':
+            df.to_feather(fout)
+        lst4out.append(fout)
+    return lst4out
+
+# read_table --> Read table saved by write_tables
+def read_table(
+        # Input variables:
+        pin:str,                # Input path without extension (as in write_tables)
+        name:str,               # Table name
+        form:str = table_format, # Input format
+        # Output variables:
+    ) -> pd.DataFrame:          # Table
+    if form == '.xlsx':
+        return pd.read_excel(pin + form, sheet_name = name[:31])
+    fin = f'{pin}_{name}{form}'
+    if form == '.csv':
+        return pd.read_csv(fin)
+    if form == '.parquet':
+        return pd.read_parquet(fin)
+    if form == '.feather':
+        return pd.read_feather(fin)
+    raise ValueError(f'Input format {form} is not supported: {table_formats}')
+
+# read_tables --> Read all tables saved by write_tables
+def read_tables(
+        # Input variables:
+        pin:str,                # Input path without extension (as in write_tables)
+        form:str = table_format, # Input format
+        # Output variables:
+    ) -> dict:                  # Tables {table name : dataframe}
+    if form == '.xlsx':
+        return pd.read_excel(pin + form, sheet_name = None)
+    folder, prefix = os.path.split(pin + '_')
+    return {
+        file[len(prefix):-len(form)] : read_table(pin, file[len(prefix):-len(form)], form)
+        for file in sorted(os.listdir(folder or '.'))
+        if file.startswith(prefix) and file.endswith(form)
+    }
@@ -4,6 +4,10 @@ Description: Module with functions for visualization
     1. line_plots    --> create linear plot
     2. scatter_plots --> create scatter plot with regression line
     3. boxplots      --> create boxplot
+    4. column_plot   --> create linear plot for column of dataframe
+    5. render_figures --> create figures from list of jobs in a process pool
+    6. figure_key    --> get hash key of figure (data and plot settings)
+    7. finalize_figures --> create final figures for kept draft figures
 
 Authors: Evgenii Churiulin
 
@@ -20,13 +24,44 @@ Version    Date       Name
            Code refactoring
     1.3    09.08.2023 Evgenii Churiulin, MPI-BGC
            Add new class for visualization
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add parallel rendering of figures (jobs), figures are created
+           without pyplot
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Line plots reuse one figure for all periods of a job
+    1.6    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add figure cache (figures with the same data and settings are
+           not created again)
+    1.7    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add render profiles (draft, publication) and finalize_figures
+           for draft figures
+    1.8    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Scatter plots with many points are replaced by density plots
+    1.9    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Scatter plots can use precalculated regression (lib4statistics)
+    1.10   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Complex plot gets station data as l4p.StationSeries
+    1.11   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Periods of line plots are split between processes by default
+    1.12   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Render profile and targets are arguments of plot functions
+    1.13   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Key of scatter plot is based only on x and y series
+    1.14   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Station name of complex plot is an argument (no default station)
+    1.15   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Complex_PLT gets time windows of station data (l4p.StationSeries)
 """
 # =============================     Import modules     =====================
 import os
 import sys
+import json
+import pickle
+import hashlib
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib import rcParams
 import matplotlib.dates as mdates
 import warnings
@@ -35,20 +70,236 @@ from scipy import stats
 # 1.2 Personal modules:
 sys.path.append(os.path.join(os.getcwd(), '..'))
 import lib4processing as l4p
+import lib4sys_support as l4s
 days = mdates.DayLocator(5)
+# -- Version of figures (change it, if you change plot functions) and name of
+#    file with hash keys of figures (in each output folder):
+figure_version = '1.0'
+figure_keys    = 'figure_keys.json'
+# -- Render profiles (draft - fast preview, publication - final figures,
+#    format can be changed to svg or pdf):
+render_profiles = {
+    'draft'       : {'dpi' :  72, 'format' : 'png'},
+    'publication' : {'dpi' : 300, 'format' : 'png'},
+}
 
 # =============================   Personal functions   =====================
 
-# line_plots --> Create a line plot with for tic and toc experiments devided by periods
-def line_plots(
+# figure_key --> Get hash key of figure based on data and plot settings
+def figure_key(
+        # Input variables:
+        data,                             # Data of figure (pd.Series, pd.DataFrame or list of them)
+        settings,                         # Plot settings (should be serializable with json)
+        # Output variables:
+    ) -> str:                             # Hash key (sha256)
+    key = hashlib.sha256()
+    for obj in (data if isinstance(data, list) else [data]):
+        names = list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name
+        key.update(pd.util.hash_pandas_object(obj, index = True).values.tobytes())
+        key.update(json.dumps(names, default = str).encode())
+    key.update(
+        json.dumps([figure_version, settings], sort_keys = True, default = str).encode())
+    return key.hexdigest()
+
+# read_figure_keys --> Get hash keys of figures from output folder
+def read_figure_keys(
+        # Input variables:
+        folder:str,                       # Output folder with figures
+        # Output variables:
+    ) -> dict:                            # Hash keys {figure name : key}
+    pin = os.path.join(folder, figure_keys)
+    if not os.path.exists(pin):
+        return {}
+    with open(pin) as f:
+        return json.load(f)
+
+# is_figure_cached --> Check that figure exists and was created with the same key
+def is_figure_cached(
+        # Input variables:
+        fout:str,                         # Figure path
+        key:str,                          # Hash key of figure
+        dct4keys:dict,                    # Hash keys of output folders {folder : keys}
+        profile:str = 'publication',      # Render profile
+        # Output variables:
+    ) -> bool:                            # True - figure can be skipped
+    folder = os.path.dirname(fout)
+    if folder not in dct4keys:
+        dct4keys[folder] = read_figure_keys(folder)
+    # -- Draft figure can be replaced by final figure (not vice versa):
+    lst4keys = [key] if profile == 'publication' else [key, f'{key}.{profile}']
+    return (os.path.exists(figure_path(fout, profile)) and
+            dct4keys[folder].get(os.path.basename(fout)) in lst4keys)
+
+# save_figure_keys --> Save hash keys of new figures in output folders
+def save_figure_keys(
+        # Input variables:
+        dct4figs:dict,                    # New figures {figure path : hash key}
+        dct4keys:dict,                    # Hash keys of output folders {folder : keys}
+        profile:str = 'publication',      # Render profile
+        # Output variables:
+    ):                                    # Update files with hash keys
+    for fout, key in dct4figs.items():
+        folder = os.path.dirname(fout)
+        if folder not in dct4keys:
+            dct4keys[folder] = read_figure_keys(folder)
+        dct4keys[folder][os.path.basename(fout)] = (
+            key if profile == 'publication' else f'{key}.{profile}')
+    for folder in {os.path.dirname(fout) for fout in dct4figs}:
+        with open(os.path.join(folder, figure_keys), 'w') as f:
+            json.dump(dct4keys[folder], f, indent = 1, sort_keys = True)
+
+# figure_path --> Get figure path for render profile (extension = format)
+def figure_path(
+        # Input variables:
+        fout:str,                         # Figure path (png)
+        profile:str,                      # Render profile
+        # Output variables:
+    ) -> str:                             # Figure path
+    return os.path.splitext(fout)[0] + '.' + render_profiles.get(profile)['format']
+
+# save_figure --> Save figure with settings of render profile
+def save_figure(
+        # Input variables:
+        fig:Figure,                       # Figure
+        fout:str,                         # Figure path (png)
+        profile:str = 'publication',      # Render profile
+        targets:set = None,               # Figures which have to be saved (None - all)
+        # Output variables:
+    ):                                    # Create figure in output folder
+    if targets is not None and fout not in targets:
+        return
+    prf = render_profiles.get(profile)
+    fig.savefig(figure_path(fout, profile), format = prf['format'],
+                dpi = prf['dpi'])
+
+# render_job --> Create one figure (task for process pool)
+def render_job(
+        # Input variables:
+        func,                             # Plot function
+        args:tuple,                       # Arguments of plot function
+        kwargs:dict,                      # Additional parameters of plot function
+        profile:str = 'publication',      # Render profile
+        targets:set = None,               # Figures which have to be saved (None - all)
+        # Output variables:
+    ):                                    # Create figure in output folder
+    func(*args, **kwargs, profile = profile, targets = targets)
+
+# render_figures --> Create figures from list of jobs in a process pool
+def render_figures(
+        # Input variables:
+        jobs:list[tuple],                 # Jobs: (plot function, arguments, additional parameters,
+                                          #        {figure path : hash key})
+        workers:int = 1,                  # Number of processes
+        lcache:bool = False,              # Skip figures which exist and have the same keys
+        profile:str = 'publication',      # Render profile (draft, publication)
+        pqueue:str = None,                # Queue of draft figures for finalize_figures
+        # Output variables:
+    ):                                    # Create figures in output folders
+    dct4keys = {}
+    # -- Get figures which have to be created:
+    tasks = []
+    for job in jobs:
+        figs = job[3]
+        if lcache is True:
+            figs = {
+                fout : key for fout, key in figs.items()
+                if not is_figure_cached(fout, key, dct4keys, profile)
+            }
+        if len(figs) > 0:
+            tasks.append((job, figs))
+    if lcache is True:
+        nfigs = sum(len(job[3]) for job in jobs)
+        nnew  = sum(len(figs) for job, figs in tasks)
+        print(f'Figures: {nfigs - nnew} figures from {nfigs} are in cache')
+    l4s.run_parallel(
+        render_job,
+        [(*job[:3], profile, set(figs)) for job, figs in tasks],
+        workers,
+    )
+    # -- Save hash keys of new figures:
+    save_figure_keys(
+        {fout : key for job, figs in tasks for fout, key in figs.items()},
+        dct4keys, profile,
+    )
+    # -- Save draft figures in queue (final figures can be created later):
+    if profile != 'publication' and pqueue is not None:
+        queue_figures(pqueue, [(job, figs, profile) for job, figs in tasks])
+
+# read_queue --> Get queue of draft figures
+def read_queue(
+        # Input variables:
+        pqueue:str,                       # Path to the queue file
+        # Output variables:
+    ) -> list[tuple]:                     # Queue: (job, {figure path : hash key}, profile)
+    if not os.path.exists(pqueue):
+        return []
+    with open(pqueue, 'rb') as f:
+        return pickle.load(f)
+
+# queue_figures --> Add draft figures to queue (new figures replace old figures)
+def queue_figures(
+        # Input variables:
+        pqueue:str,                       # Path to the queue file
+        tasks:list[tuple],                # New drafts: (job, {figure path : hash key}, profile)
+        # Output variables:
+    ):                                    # Update queue file
+    new = {fout for job, figs, profile in tasks for fout in figs}
+    queue = []
+    for job, figs, profile in read_queue(pqueue):
+        figs = {fout : key for fout, key in figs.items() if fout not in new}
+        if len(figs) > 0:
+            queue.append((job, figs, profile))
+    with open(pqueue, 'wb') as f:
+        pickle.dump(queue + tasks, f)
+
+# finalize_figures --> Create final figures for draft figures which still exist
+def finalize_figures(
+        # Input variables:
+        pqueue:str,                       # Path to the queue file
+        workers:int = 1,                  # Number of processes
+        profile:str = 'publication',      # Render profile of final figures
+        # Output variables:
+    ):                                    # Create figures in output folders
+    # -- Get draft figures (user can delete draft figures, which are not needed):
+    tasks = []
+    for job, figs, draft in read_queue(pqueue):
+        figs = {
+            fout : key for fout, key in figs.items()
+            if os.path.exists(figure_path(fout, draft))
+        }
+        if len(figs) > 0:
+            tasks.append((job, figs, draft))
+    print(f'Figures: {sum(len(figs) for job, figs, draft in tasks)} '
+          f'draft figures are finalized')
+    l4s.run_parallel(
+        render_job,
+        [(*job[:3], profile, set(figs)) for job, figs, draft in tasks],
+        workers,
+    )
+    save_figure_keys(
+        {fout : key for job, figs, draft in tasks for fout, key in figs.items()},
+        {}, profile,
+    )
+    # -- Remove draft figures with other format and queue:
+    for job, figs, draft in tasks:
+        for fout in figs:
+            if figure_path(fout, draft) != figure_path(fout, profile):
+                os.remove(figure_path(fout, draft))
+    if os.path.exists(pqueue):
+        os.remove(pqueue)
+
+# line_plot --> Create line plots for periods (figure template is created once)
+def line_plot(
         # Input variables:
         lines_count:int,                  # Numbers of lines, which you want to plot
-        data:list[pd.Series],             # Research data presented as list of timeseries
+        data:list[pd.Series],             # Research data for periods presented as list of timeseries
         plt_set:dict,                     # Plot settings (legend, colors, style)
         set4line_plot:dict,               # Plot settings (fontsize, pads, limits)
         mask:str,                         # Experiment id
-        periods:str,                      # Number of iterations (plots)
-        pout:str,                         #  Output path
+        lst4range:list[tuple],            # Periods (first and last point), first point of data - lst4range[0][0]
+        pout:str,                         # Output path
+        profile:str = 'publication',      # Render profile
+        targets:set = None,               # Figures which have to be saved (None - all)
         # Output variables:
     ):                                    # Create figures in output folder
     # -- Local variables (Plot settings):
@@ -62,42 +313,107 @@ def line_plots(
     y_max  = set4line_plot.get(mask)[5]
     y_step = set4line_plot.get(mask)[6]
     x_step = set4line_plot.get(mask)[7]
+    # -- Create plot template (lines, legend, titles and grid):
+    fig = Figure(figsize = (12,7))
+    ax  = fig.add_subplot(111)
+    lines = []
+    for i in range(lines_count):
+        lines.append(ax.plot(
+            [], [],
+            label = plt_set.get('legends')[i],
+            color = plt_set.get('colors')[i],
+            linestyle = plt_set.get('styles')[i],
+        )[0])
+    ax.legend()
+    ax.set_title(ptitle,  color = clr, fontsize = fsize, pad      = lpab)
+    ax.set_xlabel(xlabel, color = clr, fontsize = fsize, labelpad = lpab)
+    ax.set_ylabel(ylable, color = clr, fontsize = fsize, labelpad = lpab)
+    ax.grid(True, which='major', color='grey', linestyle='dashed', alpha=0.2)
+    # -- Update data, limits and ticks for each period:
+    x0 = lst4range[0][0]
+    for y1, y2 in lst4range:
+        for i in range(lines_count):
+            ts = data[i][y1 - x0:y2 - x0]
+            lines[i].set_data(ts.index, ts)
+        ax.relim()
+        ax.autoscale_view()
+        # -- Get x and y ticks parameters:
+        ax.set_yticks(np.arange(y_min, y_max, y_step))
+        ax.set_xticks(np.arange(y1, y2, x_step ))
+        #-- Plot save
+        save_figure(fig, pout + f'_in_range_{y1}_{y2}.png', profile, targets)
+
+# line_plot_jobs --> Get jobs for line plots (one job - group of periods)
+def line_plot_jobs(
+        # Input variables:
+        lines_count:int,                  # Numbers of lines, which you want to plot
+        data:list[pd.Series],             # Research data presented as list of timeseries
+        plt_set:dict,                     # Plot settings (legend, colors, style)
+        set4line_plot:dict,               # Plot settings (fontsize, pads, limits)
+        mask:str,                         # Experiment id
+        periods:str,                      # Number of iterations (plots)
+        pout:str,                         #  Output path
+        chunks:int = None,                # Number of jobs (groups of periods), None - number of CPUs
+        # Output variables:
+    ) -> list[tuple]:                     # Jobs for render_figures
+    # -- Periods are rendered in parallel (one figure template for each job):
+    if chunks is None:
+        chunks = os.cpu_count() or 1
     # -- Get ranges
     if len(data[0]) == len(data[1]):
         step = (len(data[0]) + 1) / periods
         ranges = np.arange(len(data[0]) - len(data[0]), len(data[0]) + 1, step)
     else:
         sys.exit('data len is different')
-    # -- Create plots:
+    lst4range = []
+    dct4figs  = {}
     for i in range(periods):
         if i+1 <= periods - 1:
-            fig = plt.figure(figsize = (12,7))
-            ax  = fig.add_subplot(111)
             y1 = int(ranges[i])
             y2 = int(ranges[i+1])
-            for i in range(lines_count):
-                ax.plot(
-                    data[i][y1:y2].index,
-                    data[i][y1:y2],
-                    label = plt_set.get('legends')[i],
-                    color = plt_set.get('colors')[i],
-                    linestyle = plt_set.get('styles')[i],
-                )
-            # -- Add plot legend and titles:
-            ax.legend()
-            ax.set_title(ptitle,  color = clr, fontsize = fsize, pad      = lpab)
-            ax.set_xlabel(xlabel, color = clr, fontsize = fsize, labelpad = lpab)
-            ax.set_ylabel(ylable, color = clr, fontsize = fsize, labelpad = lpab)
-            # -- Get x and y ticks parameters:
-            ax.set_yticks(np.arange(y_min, y_max, y_step))
-            ax.set_xticks(np.arange(y1, y2, x_step ))
-            # -- Grid settings
-            ax.grid(True, which='major', color='grey', linestyle='dashed', alpha=0.2)
-            #-- Plot save
-            plt.savefig(pout + f'_in_range_{y1}_{y2}.png', format='png', dpi = 300) 
-            #-- Clean memory
-            plt.close(fig)        
-            plt.gcf().clear()
+            fout = pout + f'_in_range_{y1}_{y2}.png'
+            key = figure_key(
+                [ts[y1:y2] for ts in data],
+                ['line_plot', plt_set, set4line_plot.get(mask), y1, y2],
+            )
+            lst4range.append((y1, y2))
+            dct4figs[(y1, y2)] = (fout, key)
+    # -- Create jobs:
+    jobs = []
+    for group in np.array_split(np.arange(len(lst4range)), max(chunks, 1)):
+        if len(group) == 0:
+            continue
+        group = [lst4range[i] for i in group]
+        x1, x2 = group[0][0], group[-1][1]
+        jobs.append((
+            line_plot,
+            (lines_count, [ts[x1:x2] for ts in data], plt_set,
+             set4line_plot, mask, group, pout),
+            {},
+            dict(dct4figs[rng] for rng in group),
+        ))
+    return jobs
+
+# line_plots --> Create a line plot with for tic and toc experiments devided by periods
+def line_plots(
+        # Input variables:
+        lines_count:int,                  # Numbers of lines, which you want to plot
+        data:list[pd.Series],             # Research data presented as list of timeseries
+        plt_set:dict,                     # Plot settings (legend, colors, style)
+        set4line_plot:dict,               # Plot settings (fontsize, pads, limits)
+        mask:str,                         # Experiment id
+        periods:str,                      # Number of iterations (plots)
+        pout:str,                         #  Output path
+        workers:int = 1,                  # Number of processes
+        lcache:bool = False,              # Skip periods with existing figures and the same keys
+        profile:str = 'publication',      # Render profile (draft, publication)
+        # Output variables:
+    ):                                    # Create figures in output folder
+    render_figures(
+        line_plot_jobs(lines_count, data, plt_set, set4line_plot, mask,
+                       periods, pout, chunks = workers),
+        workers, lcache = lcache, profile = profile,
+    )
 
 # -- scatter_plots --> Create scatter plot:
 def scatter_plots(
@@ -107,6 +423,12 @@ def scatter_plots(
         mask:str,                         # Experiment id
         num:int,                          # Additional prefix for plots
         pout:str,                         # Output path
+        npoints:int = 5000,               # Max number of points for scatter plot, if the number
+                                          # of points is bigger - density plot (None - scatter plot)
+        reg:dict = None,                  # Regression parameters (slope, intercept), if None -
+                                          # regression is calculated
+        profile:str = 'publication',      # Render profile
+        targets:set = None,               # Figures which have to be saved (None - all)
         # Output variables:
     ):                                    # create figures in your output folder
     # -- Plot settings:
@@ -120,19 +442,40 @@ def scatter_plots(
     x_max = set4scat_plot.get(mask)[4]    
     y_min = set4scat_plot.get(mask)[5]
     y_max = set4scat_plot.get(mask)[6]
+    # -- Points are rasterized for vector formats (svg, pdf):
+    lraster = render_profiles.get(profile)['format'] not in ('png', 'jpg')
+    ldensity = npoints is not None and len(data) > npoints
     # -- Create plot area:
-    fig = plt.figure(figsize = (12, 7))
+    fig = Figure(figsize = (12, 7))
     ax  = fig.add_subplot(111) 
-    ax.scatter(
-        data['ergebnis_tic'],
-        data['ergebnis_toc'],
-        s = 60,
-        alpha = 0.6,
-        edgecolors = "k",
-    )
+    if ldensity:
+        # -- Density plot (number of samples in hexagons):
+        pts = data[['ergebnis_tic', 'ergebnis_toc']].dropna()
+        pts = pts[pts['ergebnis_tic'].between(x_min, x_max) &
+                  pts['ergebnis_toc'].between(y_min, y_max)]
+        hb = ax.hexbin(
+            pts['ergebnis_tic'],
+            pts['ergebnis_toc'],
+            gridsize = 100,
+            extent = (x_min, x_max, y_min, y_max),
+            mincnt = 1,
+            bins = 'log',
+            cmap = 'viridis',
+            rasterized = lraster,
+        )
+        fig.colorbar(hb, ax = ax, label = 'Number of samples')
+    else:
+        ax.scatter(
+            data['ergebnis_tic'],
+            data['ergebnis_toc'],
+            s = 60,
+            alpha = 0.6,
+            edgecolors = "k",
+            rasterized = lraster,
+        )
     # -- Get y ticks parameters:
-    plt.xlim(x_min, x_max)
-    plt.ylim(y_min, y_max)
+    ax.set_xlim(x_min, x_max)
+    ax.set_ylim(y_min, y_max)
     # -- Labels:
     ax.set_title(ptitle , color = clr, fontsize = fsize, pad      = lpab)
     ax.set_xlabel(xlabel, color = clr, fontsize = fsize, labelpad = lpab)
@@ -140,25 +483,50 @@ def scatter_plots(
     #-- Grid settings:
     ax.grid(True, which='major', color='grey', linestyle = 'dashed', alpha = 0.2)
     # -- Plot regression line:
-    data = data.dropna()
-    slope, intercept, r_value, p_value, std_err = (
-        stats.linregress(data['ergebnis_tic'],
-                         data['ergebnis_toc'])
-    )
-    line = slope * data['ergebnis_tic'] + intercept
+    if reg is None:
+        data = data.dropna()
+        slope, intercept, r_value, p_value, std_err = (
+            stats.linregress(data['ergebnis_tic'],
+                             data['ergebnis_toc'])
+        )
+    else:
+        data = data[['ergebnis_tic', 'ergebnis_toc']].dropna()
+        slope, intercept = reg.get('slope'), reg.get('intercept')
+    # -- Regression line (only 2 points are needed for density plot):
+    x = data['ergebnis_tic']
+    if ldensity:
+        x = pd.Series([x.min(), x.max()])
+    line = slope * x + intercept
     ax.plot(
-        data['ergebnis_tic'],
+        x,
         line, 
         color="red", 
         lw=2.5, 
         label='y={:.2f}x+{:.2f}'.format(slope,intercept)
     )
     # -- Add legend
-    plt.legend(fontsize=9)
-    # -- Save plot and clean memory:
-    plt.savefig(pout + f'_correlation_{num}.png', format = 'png', dpi = 300)
-    plt.close(fig)
-    plt.gcf().clear()  
+    ax.legend(fontsize=9)
+    # -- Save plot:
+    save_figure(fig, pout + f'_correlation_{num}.png', profile, targets)
+
+# -- scatter_plot_job --> Get job for scatter plot
+def scatter_plot_job(
+        # Input variables:
+        data:pd.DataFrame,                # Data for visulaization
+        set4scat_plot:dict,               # Plot settings (fontsize, pads, limits)
+        mask:str,                         # Experiment id
+        num:int,                          # Additional prefix for plots
+        pout:str,                         # Output path
+        npoints:int = 5000,               # Max number of points for scatter plot
+        reg:dict = None,                  # Regression parameters (slope, intercept)
+        # Output variables:
+    ) -> tuple:                           # Job for render_figures
+    fout = pout + f'_correlation_{num}.png'
+    # -- Key of figure is based only on plotted series (x and y) and settings:
+    key  = figure_key([data['ergebnis_tic'], data['ergebnis_toc']],
+                      ['scatter_plots', set4scat_plot.get(mask), npoints, reg])
+    return (scatter_plots, (data, set4scat_plot, mask, num, pout),
+            {'npoints' : npoints, 'reg' : reg}, {fout : key})
 
 
 # -- boxplots --> Create boxplot based on our research data
@@ -168,11 +536,13 @@ def boxplots(
         col:str,                         # Name of the column for boxplot
         pout:str,                        # Output path
         name:str,                        # Boxplot output prefix name
+        profile:str = 'publication',     # Render profile
+        targets:set = None,              # Figures which have to be saved (None - all)
         **kwargs,                        # Additional parameters for plot
         # Output variables:
     ):                                   # Create figures in your output folder
     # -- Create plot:
-    fig = plt.figure(figsize = (12, 7))
+    fig = Figure(figsize = (12, 7))
     ax  = fig.add_subplot(111) 
     df.plot(
         y = col,
@@ -182,16 +552,60 @@ def boxplots(
         grid = True,
         **kwargs,
     )
-    # -- Save plot and clean memory:
-    plt.savefig(pout + f'_boxplot_{name}.png', format='png', dpi = 300)
-    plt.close(fig)
-    plt.gcf().clear()
+    # -- Save plot:
+    save_figure(fig, pout + f'_boxplot_{name}.png', profile, targets)
+
+
+# -- boxplot_job --> Get job for boxplot
+def boxplot_job(
+        # Input variables:
+        df:pd.DataFrame,                 # Research data
+        col:str,                         # Name of the column for boxplot
+        pout:str,                        # Output path
+        name:str,                        # Boxplot output prefix name
+        **kwargs,                        # Additional parameters for plot
+        # Output variables:
+    ) -> tuple:                          # Job for render_figures
+    fout = pout + f'_boxplot_{name}.png'
+    key  = figure_key(df, ['boxplots', col, kwargs])
+    return (boxplots, (df, col, pout, name), kwargs, {fout : key})
+
+
+# -- column_plot --> Create linear plot for column of dataframe
+def column_plot(
+        # Input variables:
+        df:pd.DataFrame,                 # Research data (time index)
+        col:str,                         # Name of the column
+        fout:str,                        # Output path (with file name)
+        profile:str = 'publication',     # Render profile
+        targets:set = None,              # Figures which have to be saved (None - all)
+        # Output variables:
+    ):                                   # Create figure in your output folder
+    fig = Figure(figsize = (12,7))
+    ax  = fig.add_subplot(111)
+    ax.plot(df.index, df[col])
+    save_figure(fig, fout, profile, targets)
+
+
+# -- column_plot_job --> Get job for linear plot of column
+def column_plot_job(
+        # Input variables:
+        df:pd.DataFrame,                 # Research data (time index)
+        col:str,                         # Name of the column
+        fout:str,                        # Output path (with file name)
+        # Output variables:
+    ) -> tuple:                          # Job for render_figures
+    data = df[[col]]
+    key  = figure_key(data, ['column_plot', col])
+    return (column_plot, (data, col, fout), {}, {fout : key})
 
 
 class Complex_PLT:
-    def __init__(self, title, leg_loc):
+    def __init__(self, data, leg_loc, title = None):
         # Set common parameters for all figures:
-        self.title = title    # Common plot title
+        self.data  = data     # Station data (l4p.StationSeries)
+        self.title = (        # Common plot title (default - station name)
+            data.station.replace('_', ' ') if title is None else title)
         self.clr   = 'black'  # Color of labels
         self.fsize = 14       # Size of labels
         self.pad   = 20       # Space betveen axis and label
@@ -280,20 +694,23 @@ class Complex_PLT:
             )
 
 
-    def t2m_plot(self, ax, df):
+    def t2m_plot(self, ax, t1, t2, cols):
         """T2m linear plot"""
+        df = self.data.slice(t1, t2, cols)
         ax.plot(df.index, df, label = 'T2m', color = 'red')
         return ax
 
 
-    def precip_plot(self, ax, df):
+    def precip_plot(self, ax, t1, t2, cols):
         """Precipitation bar plot"""
-        ax.bar(df.index, df['rain (mm)'], label = 'Prec', color = 'green')
+        df = self.data.slice(t1, t2, cols)
+        ax.bar(df.index, df[cols[0]], label = 'Prec', color = 'green')
         return ax
 
 
-    def sm_plot(self, ax, df):
-        """Soil moisture linear plot"""
+    def sm_plot(self, ax, t1, t2, cols, depth):
+        """Soil moisture linear plot (profile for each date)"""
+        df = l4p.soil_profiles(self.data, t1, t2, cols, depth)
         # -- Get actual columns:
         cols = df.columns.tolist()
         # -- Defeni actual colors for line
@@ -305,14 +722,21 @@ class Complex_PLT:
         return ax
 
 
-def complex_plot(df, df_sets, t2m_sets, prec_sets, sm_sets):
+def complex_plot(data, df_sets, t2m_sets, prec_sets, sm_sets, station = None):
     # -- Local variables:
     fig_length = 14
     fig_higth = 10
     cols = 3
     rows = 4
-    # -- Get data for visualization:
-    df_temp, df_prec, df_soil = l4p.get_complex_plot_data(df, df_sets)
+    # -- Station data (l4p.StationSeries or dataframe with column time, station
+    #    name is needed for dataframe):
+    if not isinstance(data, l4p.StationSeries):
+        if station is None:
+            raise ValueError('Station name is needed for complex plot of dataframe')
+        data = l4p.StationSeries(data, station)
+    station = data.station if station is None else station
+    # -- Time window for visualization:
+    t1, t2 = df_sets.get('tstart'), df_sets.get('tstop')
 
     # -- Create figure and set figure parameters:
     fig = plt.figure(figsize = (fig_length, fig_higth))
@@ -331,15 +755,15 @@ def complex_plot(df, df_sets, t2m_sets, prec_sets, sm_sets):
     ax2 = plt.subplot2grid(egrid, (1, 0), colspan = 3)
     ax3 = plt.subplot2grid(egrid, (2, 0), colspan = 3, rowspan = 2)
     # -- Create complex plot:
-    plot = Complex_PLT('WS Saaleaue', 'upper right')
+    plot = Complex_PLT(data, 'upper right', station.replace('_', ' '))
     # -- Add first plot:
-    plot.t2m_plot(ax1, df_temp)
+    plot.t2m_plot(ax1, t1, t2, df_sets.get('t2m_col'))
     plot.plt_uniq_settings(ax1, t2m_sets)
     # -- Add second plot:
-    plot.precip_plot(ax2, df_prec)
+    plot.precip_plot(ax2, t1, t2, df_sets.get('prec_col'))
     plot.plt_uniq_settings(ax2, prec_sets)
     # -- Add trird plot:
-    plot.sm_plot(ax3, df_soil)
+    plot.sm_plot(ax3, t1, t2, df_sets.get('sm_cols'), df_sets.get('levels'))
     plot.plt_uniq_settings(ax3, sm_sets)
     # -- Save plot:
     plt.savefig(df_sets.get('fout'), format = 'png', dpi = 300)
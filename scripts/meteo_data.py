@@ -14,6 +14,31 @@ Version    Date       Name
 ---------- ---------- ----                                                   
     1.1    09.08.2023 Evgenii Churiulin, MPI-BGC
            Initial release
+    1.2    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Linear plots are created in parallel (figure jobs)
+    1.3    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Linear plots with unchanged data are not created again
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Data of all stations is saved in one file (l4s.write_tables)
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Raw data is read by pyarrow csv engine (float32, chunks)
+    1.6    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Precipitation is summed, several aggregates in one resampling
+    1.7    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Resolution pyramid of stations for plots (l4proc.read_pyramid)
+    1.8    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Stations are processed in parallel (merged error report)
+    1.9    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Station archive partitioned by year and month (l4proc.read_archive)
+    1.10   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Complex plot and 3D plot use station data (l4proc.StationSeries)
+    1.11   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Fast default format of tables (l4s.table_format)
+    1.12   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Option for reading of csv files by chunks is removed (raw 10 minutes
+           data is needed for the station archive, chunks didn't reduce memory)
+    1.13   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Time axis of 3D plot is based on time of selected pyramid level
 """
 
 # =============================     Import modules     ==================
@@ -22,6 +47,7 @@ import os
 from os import listdir
 from os.path import isfile, join
 import sys
+from importlib.util import find_spec
 import chardet
 import numpy as np
 import pandas as pd
@@ -71,43 +97,92 @@ def check_data_type(file):
     print(result)
 
 
-def get_data(
+# -- read_meteo_csv --> Read raw 10 minutes data from csv file (float32)
+def read_meteo_csv(
         # Input parameters:
         act_path:str,                    # Input path with data
-        index_ds:int,                    # index of dataset
+        engine:str = 'pyarrow',          # CSV engine ('pyarrow' or 'c')
+        dtype:str = 'float32',           # Data type of parameters
         # Output parameters:
-    ) -> pd.DataFrame:                   # Daily data
+    ) -> pd.DataFrame:                   # Raw data (index - time)
+    # -- pyarrow is optional, without it we use the 'c' engine:
+    if engine == 'pyarrow' and find_spec('pyarrow') is None:
+        engine = 'c'
+    # -- Explicit data types (all columns except time are parameters):
+    cols = pd.read_csv(act_path, encoding = 'ISO-8859-1', nrows = 0).columns
+    params = [col for col in cols if col != 'Date Time']
+    # -- Only text sentinel is parsed by csv engine, numerical sentinels
+    #    (-9999, -9999.00, -9999.99) are masked after the read:
+    if engine == 'pyarrow':
+        # -- pyarrow parses time column itself (faster than pd.to_datetime):
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        dct4types = {col : pa.from_numpy_dtype(np.dtype(dtype)) for col in params}
+        dct4types['Date Time'] = pa.timestamp('ns')
+        table = pa_csv.read_csv(
+            act_path,
+            read_options = pa_csv.ReadOptions(encoding = 'ISO-8859-1'),
+            convert_options = pa_csv.ConvertOptions(
+                column_types = dct4types,
+                timestamp_parsers = ['%d.%m.%Y %H:%M:%S'],
+                null_values = ['', 'NaN', 'nan', '********'],
+            ),
+        )
+        df = table.to_pandas()
+    else:
+        dct4types = {col : dtype for col in params}
+        dct4types['Date Time'] = 'str'
+        df = pd.read_csv(
+            act_path,
+            encoding = 'ISO-8859-1',
+            sep = ',',
+            header = 0,
+            dtype = dct4types,
+            na_values = ['********'],
+        )
+    # -- Convert time index:
+    df = df.set_index(
+        pd.to_datetime(df.pop('Date Time'), format='%d.%m.%Y %H:%M:%S')
+        .rename('time')
+    )
+    # -- Numerical sentinels:
+    return df.mask(df.to_numpy() <= -9999.0)
+
+
+def get_raw_data(
+        # Input parameters:
+        lst4paths:list[str],             # Input paths with data of one station
+        engine:str = 'pyarrow',          # CSV engine ('pyarrow' or 'c')
+        # Output parameters:
+    ) -> pd.DataFrame:                   # Raw 10 minutes data
 
     # -- Files use unusual encoding protocol -> you can get it by this function:
     #check_data_type(act_path)
-    # -- Read raw data from csv files:
-    df = pd.read_csv(
-        act_path, 
-        encoding = 'ISO-8859-1',
-        skiprows = 0,
-        sep=',', 
-        header = 0, 
-        na_values = ['-9999.99', '-9999', '-9999.00', '********'],
-        )
+    # -- Read raw data from csv files and merge data by time (files are
+    #    merged before resampling, bins can be in 2 files):
+    df = (
+        pd.concat([read_meteo_csv(pin, engine) for pin in lst4paths],
+                  axis = 0)
+          .sort_index()
+    )
     # -- Check data types:
     #df.info()
     # -- Check column names:
     #print(df.columns)
-    # -- Convert time index:
-    index = pd.to_datetime(df['Date Time'], format='%d.%m.%Y %H:%M:%S')
-    # -- Reset index and drop columns:
-    df = (
-        df.reset_index(drop = True)
-          .set_index(index)
-          .drop('Date Time', axis = 1)
-    )
-    df.index.name = 'time'
-    # -- Resample:
-    df2 = df
-    if index_ds <= 1:
-        df2['rain (mm)'] = df['rain (mm)'].resample('1D').sum()
-    df2 = df.resample('1D').mean()
-    return df2
+    return df
+
+
+def get_data(
+        # Input parameters:
+        lst4paths:list[str],             # Input paths with data of one station
+        freq:str = 'day',                # Frequency of output data (l4proc.set4freq)
+        dct4agg:dict = None,             # Aggregates (None - l4proc.set4resample)
+        engine:str = 'pyarrow',          # CSV engine ('pyarrow' or 'c')
+        # Output parameters:
+    ) -> pd.DataFrame:                   # Resampled data (daily data by default)
+    # -- Resample (sum of precipitation, mean, min, max for T and SM):
+    return l4proc.resample_data(
+        get_raw_data(lst4paths, engine), freq, dct4agg)
 
 
 def get_params_units(
@@ -143,6 +218,147 @@ def get_params_units(
         item.translate({ord(SYM): None for SYM in '()'} ).strip() for item in units]
     return cols, params, units
         
+# -- read_csv_job --> Read one raw csv file (task for process pool)
+def read_csv_job(
+        # Input parameters:
+        station:str,                     # Station name
+        act_path:str,                    # Input path with data
+        engine:str = 'pyarrow',          # CSV engine ('pyarrow' or 'c')
+        # Output parameters:
+    ) -> tuple[pd.DataFrame, str]:       # Raw data or error message
+    print(f'{station}: read {os.path.basename(act_path)}')
+    try:
+        return read_meteo_csv(act_path, engine), None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+
+
+# -- station_job --> Processing of one station (task for process pool): pyramid,
+#                    output tables and jobs for linear plots
+def station_job(
+        # Input parameters:
+        station:str,                     # Station name
+        lst4paths:list[str],             # Input paths with data of station
+        set4station:dict,                # Settings of station processing
+        lst4raw:list = None,             # Raw data of files (None - files are read here)
+        # Output parameters:
+    ) -> tuple[dict,                     # Output tables {table name : dataframe}
+               list[tuple],              # Jobs for linear plots
+               list[list[str]],          # Errors [station, file, error]
+    ]:
+    # -- Local variables:
+    freq = set4station.get('freq')
+    y1, y2 = set4station.get('tstart'), set4station.get('tstop')
+    # -- Read raw data (files with errors are skipped):
+    if lst4raw is None:
+        lst4raw = [read_csv_job(station, pin, set4station.get('engine'))
+                   for pin in lst4paths]
+    lst4err = [[station, os.path.basename(pin), err]
+               for pin, (df, err) in zip(lst4paths, lst4raw) if err is not None]
+    lst4df = [df for df, err in lst4raw if err is None]
+    if len(lst4df) == 0:
+        return {}, [], lst4err + [[station, '', 'No data']]
+    try:
+        df_raw = pd.concat(lst4df, axis = 0).sort_index()
+        # -- Resolution pyramid (10 minutes, hourly, daily, monthly data):
+        dct4levels = l4proc.get_pyramid(df_raw, set4station.get('agg'))
+        l4proc.save_pyramid(dct4levels, set4station.get('pout_archive'), station)
+        if freq in dct4levels:
+            df = dct4levels.get(freq)
+        else:
+            df = l4proc.resample_data(df_raw, freq, set4station.get('agg'))
+        # -- Output table for experiment (full experiment):
+        dct4tables = {station : df}
+        
+        # -- Select data for plots and further work:
+        df_filter = df[y1:y2]
+        
+        # -- Create a full time series with data in range:
+        ts_full = pd.Series(
+            pd.date_range(
+                df_filter.index[0],
+                df_filter.index[-1], 
+                freq = l4proc.set4freq.get(freq, freq),
+            ), name = 'time'
+        )
+        # -- Reset index in filter data 
+        df_filter = df_filter.reset_index()
+        # -- Create a new dataframe with correct time steps:
+        df_filter2 = (
+            df_filter
+                .merge(ts_full, how='outer')
+                .sort_values(by='time', ascending = True)
+                .set_index('time')
+        )
+        # -- Output table for experiment (filter experiment):
+        dct4tables[f'{station}_filter'] = df_filter2
+        
+        # -- Create linear plots with filter data (the coarsest level of
+        #    pyramid with enough points):
+        plot_jobs = []
+        if set4station.get('lplot'):
+            level = l4proc.pyramid_level(y1, y2, set4station.get('npoints'))
+            df_plot = dct4levels.get(level)[y1:y2]
+            # -- Create 2 new lists with parameter name and unit
+            cols, params, units = get_params_units(df_plot)
+
+            fout = l4s.makefolder(f'{set4station.get("pout_fig")}/{station}')
+            for i,col in enumerate(cols):
+                plot_jobs.append(l4v.column_plot_job(
+                    df_plot, col, f'{fout}{params[i]}.png'))
+    except Exception as err:
+        return {}, [], lst4err + [[station, '', f'{type(err).__name__}: {err}']]
+    print(f'{station}: done ({len(lst4df)} files, {len(df_raw)} rows)')
+    return dct4tables, plot_jobs, lst4err
+
+
+# -- get_stations --> Parallel processing of stations. Files of stations can be
+#                     read in parallel before (lfile_tasks)
+def get_stations(
+        # Input parameters:
+        pin:list[list[str]],             # Input paths with data of stations
+        stations:list[str],              # Station names
+        set4station:dict,                # Settings of station processing
+        workers:int = 1,                 # Number of processes
+        lfile_tasks:bool = False,        # Do you want to read each file in its own task?
+        # Output parameters:
+    ) -> tuple[dict,                     # Output tables of all stations
+               list[tuple],              # Jobs for linear plots of all stations
+               pd.DataFrame,             # Errors of all stations (station, file, error)
+    ]:
+    # -- Stage 1: read files of all stations (one task - one file):
+    lst4raw = [None] * len(stations)
+    if lfile_tasks:
+        lst4tasks = [(station, act_path, set4station.get('engine'))
+                     for station, lst4paths in zip(stations, pin)
+                     for act_path in lst4paths]
+        results = l4s.run_parallel(read_csv_job, lst4tasks, workers)
+        for ist, station in enumerate(stations):
+            lst4raw[ist] = [res for task, res in zip(lst4tasks, results)
+                            if task[0] == station]
+    # -- Stage 2: processing of stations (one task - one station):
+    results = l4s.run_parallel(
+        station_job,
+        [(station, lst4paths, set4station, raw)
+            for station, lst4paths, raw in zip(stations, pin, lst4raw)],
+        workers,
+    )
+    # -- Merge results and errors of all stations:
+    dct4tables = {}
+    plot_jobs = []
+    lst4err = []
+    for tables, jobs, errors in results:
+        dct4tables.update(tables)
+        plot_jobs.extend(jobs)
+        lst4err.extend(errors)
+    df_err = pd.DataFrame(lst4err, columns = ['station', 'file', 'error'])
+    for station, file, err in lst4err:
+        print(f'Station {station} ({file}) was not processed: {err}')
+    print(f'Stations: {len(stations) - df_err["station"].nunique()} from '
+          f'{len(stations)} without errors')
+    return dct4tables, plot_jobs, df_err
+
+
 # ================   User settings (have to be adapted)  =============== 
 # -- Locical parameters:
 lraw_data = False  # Do you want to download raw meteodata from MPI-BGC web-page?
@@ -152,6 +368,26 @@ lplot = True     # Do you want to plot simple linear plots for all columns?
 lsoil = True       # Do you want to get complex plot (t2m, prec, soil moisture)
                    # over small period of time?
 lsoil3d = True     # Do you want to get 3D plot for soil moisture? 
+lfig_cache = True  # Do you want to skip linear plots with unchanged data?
+
+# -- Number of processes for parallel calculations (stations, plots):
+nworkers = 4
+lfile_tasks = False  # Do you want to read each csv file in its own task?
+                     # (more tasks than stations, but raw data is copied
+                     # between processes)
+
+# -- Engine for reading of raw csv files ('pyarrow' or 'c'):
+csv_engine = 'pyarrow'
+
+# -- Frequency of output data ('hour', 'day', 'week', 'month') and aggregates
+#    of parameters {pattern of column name : aggregates}, other parameters - mean:
+resample_freq = 'day'
+set4resample  = l4proc.set4resample
+
+# -- Minimal number of points in time window for linear plots and 3D plot (the
+#    coarsest level of resolution pyramid with these points is used):
+npoints4plot   = 1000
+npoints4plot3d = 300
 
 # -- Input paths and urls:    
 main = 'C:/Users/evchur/Python/scripts/github/tic_toc'      # main folder    
@@ -160,6 +396,16 @@ url_mpage = 'https://www.bgc-jena.mpg.de/wetter'            # main url address
 # -- Output folder for results:
 raw_data  = f'{main}/DATA'
 
+# -- Output file (without extension) and format of tables ('.xlsx' - one file
+#    with sheets, '.csv', '.parquet', '.feather' - one file for each table).
+#    Default: parquet (or csv without pyarrow), excel is much slower for big tables:
+pout_meteo = f'{raw_data}/meteo_data'
+form_table = l4s.table_format
+
+# -- Output folder for station archive: resolution pyramids of stations (10 minutes,
+#    hourly, daily and monthly data) partitioned by year and month (parquet):
+pout_archive = f'{raw_data}/meteo_archive'
+
 # -- Data filters (key words):
 filters  = ['mpi_roof', 'mpi_saale', 'MPI_Soil']
 stations = ['WS_Beutenberg', 'WS_Saaleaue', 'Versuchsbeete']
@@ -171,11 +417,23 @@ if lmain:
     tformat    = '%d.%m.%Y'
     y1 = pd.to_datetime(time_fltr1, format=tformat)
     y2 = pd.to_datetime(time_fltr2, format=tformat)
+    # -- Settings of station processing (station_job):
+    set4station = {
+        'freq'         : resample_freq,    # Frequency of output tables
+        'agg'          : set4resample,     # Aggregates of parameters
+        'engine'       : csv_engine,       # CSV engine
+        'pout_archive' : pout_archive,     # Output folder for station archive
+        'tstart'       : y1,               # Time filter (first date)
+        'tstop'        : y2,               # Time filter (last date)
+        'lplot'        : lplot,            # Do you want to plot linear plots?
+        'npoints'      : npoints4plot,     # Minimal number of points for plots
+        'pout_fig'     : raw_data,         # Output folder for linear plots
+    }
 
 # -- user settings for complex plot:
 if lsoil:
     # -- Set input data:
-    pin_complex_plot = f'{raw_data}/WS_Saaleaue_01.01.2020_01.01.2024.xlsx'   
+    pin_complex_plot = 'WS_Saaleaue'          # station in pout_archive
     # -- Set time filter (first / last date):
     time_fltr3 = '25.07.2023'
     time_fltr4 = '10.08.2023'
@@ -239,7 +497,7 @@ if lsoil:
 # -- User settings for complex plot:
 if lsoil3d:
     # -- Set input data:
-    pin_3d_plot = f'{raw_data}/WS_Saaleaue_01.01.2020_01.01.2024.xlsx'
+    pin_3d_plot = 'WS_Saaleaue'               # station in pout_archive
     # -- Set time filter:
     time_fltr5 = '01.01.2020'
     time_fltr6 = '01.01.2021'
@@ -249,7 +507,9 @@ if lsoil3d:
     # -- Set depth values:
     depth = [0.0, -10.0, -20.0, -30.0, -60.0]
     # -- Set columns with soil moisture, Temperature and Precipitation:
-    sm_cols  = ['SM008 (%)', 'SM016 (%)', 'SM032 (%)', 'SM064 (%)', 'SM128 (%)']   
+    sm_cols  = ['SM008 (%)', 'SM016 (%)', 'SM032 (%)', 'SM064 (%)', 'SM128 (%)']
+    # -- Number of labels on time axis:
+    nticks3d = 12   
 
 
 
@@ -267,63 +527,48 @@ if __name__ == '__main__':
     # -- Get csv data:
     if lmain:
         pin = get_csv_data(pout, filters)
+        l4s.makefolder(pout_archive)
         
-        # Make daily data from 10 minutes data:
-        datasets = []
-        for ds in range(len(pin)):
-            ds_data = []
-            for file in range(len(pin[ds])):
-                ds_data.append(get_data(pin[ds][file], ds))
-            # -- Merge data by time:
-            df = (pd.concat(ds_data, axis = 0)
-                    .sort_values(by='time', ascending = True))
-            # -- Save output files for experiment (full experiment):
-            df.to_excel(f'{raw_data}/{stations[ds]}.xlsx')    
-           
-            # -- Select data for plots and further work:
-            df_filter = df[y1:y2]
-            
-            # -- Create a full time series with data in range:
-            ts_full = pd.Series(
-                pd.date_range(
-                    df_filter.index[0],
-                    df_filter.index[-1], 
-                    freq = '1d',
-                ), name = 'time'
-            )
-            # -- Reset index in filter data 
-            df_filter = df_filter.reset_index()
-            # -- Create a new dataframe with correct time steps:
-            df_filter2 = (
-                df_filter
-                    .merge(ts_full, how='outer')
-                    .sort_values(by='time', ascending = True)
-                    .set_index('time')
-            )
-            # -- Save output files for experiment (filter experiment):
-            df_filter2.to_excel(
-                f'{raw_data}/{stations[ds]}_{time_fltr1}_{time_fltr2}.xlsx')
-            
-            # -- Create linear plots with filter data:
-            if lplot:
-                # -- Create 2 new lists with parameter name and unit
-                cols, params, units = get_params_units(df_filter2)
-
-                fout = l4s.makefolder(f'{raw_data}/{stations[ds]}')
-                for i,col in enumerate(cols):
-                    fig = plt.figure(figsize = (12,7))
-                    ax  = fig.add_subplot(111)
-                    ax.plot(df_filter2.index, df_filter2[f'{col}'])
-                    plt.savefig(f'{fout}{params[i]}.png', format = 'png', dpi = 300) 
-                    plt.close(fig)        
-                    plt.gcf().clear()            
+        # Make daily data from 10 minutes data (stations in parallel):
+        dct4tables, plot_jobs, df_err = get_stations(
+            pin, stations, set4station, nworkers, lfile_tasks)
+        if len(df_err) > 0:
+            dct4tables['errors'] = df_err
+        # -- Save output tables for all stations in one file:
+        l4s.write_tables(dct4tables, pout_meteo, form_table)
+        # -- Create linear plots for all stations:
+        l4v.render_figures(plot_jobs, nworkers, lcache = lfig_cache)
     
+    # -- Station data for complex plot and 3D plot. Each station (and level of
+    #    pyramid) is loaded once, plots get time windows and columns from it:
+    set4series = {}
+    if lsoil:
+        # -- Daily data (soil moisture profile for each day):
+        set4series.setdefault((pin_complex_plot, 'day'), []).append([
+            uset4sm_data.get('tstart'), uset4sm_data.get('tstop'),
+            (uset4sm_data.get('t2m_col') + uset4sm_data.get('prec_col') +
+             uset4sm_data.get('sm_cols')),
+        ])
+    if lsoil3d:
+        level3d = l4proc.pyramid_level(smt1, smt2, npoints4plot3d)
+        set4series.setdefault((pin_3d_plot, level3d), []).append(
+            [smt1, smt2, sm_cols])
+    dct4series = {
+        (station, level) : l4proc.StationSeries.from_archive(
+            pout_archive, station,
+            min(t1 for t1, t2, cols in lst4req),
+            max(t2 for t1, t2, cols in lst4req),
+            level = level,
+            columns = list(dict.fromkeys(
+                col for t1, t2, cols in lst4req for col in cols)),
+        )
+        for (station, level), lst4req in set4series.items()
+    }
+
     # -- Create complex plot for short period of time (1 month - maximum):      
     if lsoil:
-        # -- Get input data:
-        df = pd.read_excel(pin_complex_plot)
         l4v.complex_plot(
-            df,              # research dataset
+            dct4series.get((pin_complex_plot, 'day')),  # research dataset
             uset4sm_data,    # user settings for research data
             t2m_plot_sets,   # user settings for t2m plot
             prec_plot_sets,  # user settings for precipitation plot
@@ -331,15 +576,10 @@ if __name__ == '__main__':
         )
     
     if lsoil3d:
-        # -- Get input data:
-        df = pd.read_excel(pin_3d_plot)
-        # -- Reset time intex and take columns only with soil moisture:
-        df['time'] = pd.to_datetime(df['time']).dt.date
-        # -- Get data:
-        df_soil = df.set_index('time')[sm_cols][smt1:smt2]
-        df_soil = df_soil.reset_index()
-        # -- Get list of actual columns (exclude column with time)
-        cols = df_soil.columns.tolist()[1:]
+        # -- Get data (level of pyramid - level3d, index - time):
+        df_soil = dct4series.get((pin_3d_plot, level3d)).slice(smt1, smt2, sm_cols)
+        # -- Get list of actual columns
+        cols = df_soil.columns.tolist()
         
         # -- Create 3D plot:
         fig = plt.figure(figsize = (14, 10))
@@ -350,17 +590,17 @@ if __name__ == '__main__':
         for i,k in enumerate(yticks):
             print(i,k)
             # Generate the random data for the y=k 'layer'.
-            xs = df_soil['time'].index
+            xs = np.arange(len(df_soil))
             ys = df_soil[cols[i]]
               
             # Plot the bar graph given by xs and ys on the plane y=k with 80% opacity.
             ax.plot(xs, ys, zs=k, zdir='y', alpha=0.8, label = cols[i]) #, color=cs)
         ax.legend()
         
-        taxis = pd.date_range(time_fltr5, time_fltr6, freq = '1d')
-        taxis2 = change_format = taxis.strftime(tformat56)
-        
-        ax.set_xticklabels(taxis2)
+        # -- Labels of time axis from time of selected level:
+        xticks = np.unique(np.linspace(0, len(df_soil) - 1, nticks3d).astype(int))
+        ax.set_xticks(xticks)
+        ax.set_xticklabels(df_soil.index[xticks].strftime(tformat56))
 
         
         for label in ax.xaxis.get_ticklabels():
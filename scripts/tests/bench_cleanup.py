@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Benchmark of excel data cleanup (get_data): old row-wise cleanup
+             and vectorized cleanup (l4p.apply_schema) for 1M rows. Results
+             of both versions are compared.
+
+Run: python bench_cleanup.py [number of rows]
+"""
+import sys
+import time
+
+import pandas as pd
+
+import conftest  # noqa: F401 (path to personal modules)
+import lib4processing as l4p
+from test_lib4processing import mixed_frame, old_cleanup
+
+if __name__ == '__main__':
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = mixed_frame(nrows)
+    t0 = time.perf_counter()
+    ref = old_cleanup(df.copy(), 'file_1')
+    t1 = time.perf_counter()
+    res = l4p.apply_schema(df[list(l4p.schema4tic_toc)].copy(), l4p.schema4tic_toc)
+    res['excel_doc'] = 'file_1'
+    t2 = time.perf_counter()
+    pd.testing.assert_frame_equal(res, ref[res.columns])
+    print(f'Rows: {nrows}, old cleanup: {t1 - t0:.1f} s, '
+          f'new cleanup: {t2 - t1:.1f} s, results are identical')
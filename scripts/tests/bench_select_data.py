@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Benchmark of groupby in select_data: old aggregation with python
+             functions for each group and aggregation with categorical codes
+             (l4p.select_data) for 100k groups. Results of both versions are
+             compared.
+
+Run: python bench_select_data.py [number of groups]
+"""
+import sys
+import time
+
+import pandas as pd
+
+import conftest  # noqa: F401 (path to personal modules)
+import lib4processing as l4p
+from test_lib4processing import grouped_frame, old_select_data
+
+if __name__ == '__main__':
+    ngroups = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = grouped_frame(ngroups)
+    t0 = time.perf_counter()
+    ref = old_select_data(df, ['tic', 'toc'])
+    t1 = time.perf_counter()
+    res = l4p.select_data(df, ['tic', 'toc'])
+    t2 = time.perf_counter()
+    pd.testing.assert_frame_equal(res, ref)
+    print(f'Groups: {len(res)}, old groupby: {t1 - t0:.1f} s, '
+          f'new groupby: {t2 - t1:.2f} s, results are identical')
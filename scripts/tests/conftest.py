@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Settings for tests of personal modules (modules are in the
+             parent folder scripts)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Tests for lib4processing (preprocessing of excel data)
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import lib4processing as l4p
+
+# -- Sample excel exports and settings (the same as in tic_toc.py):
+pdata = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'DATA')
+lst4xls = sorted(glob.glob(os.path.join(pdata, '*.xls')))
+set4excel = {'sheet_name' : 0, 'skiprows' : 10, 'header' : 1}
+
+
+# -- old_cleanup --> Cleanup of get_data before vectorization (reference)
+def old_cleanup(df, df_name):
+    for col in df.columns.to_list():
+        df = df.rename(columns = {col : col.lower()})
+    df['probenjahr'] = df['probenjahr'].astype('int32')
+    df['nummer'] = df['nummer'].astype('int32')
+    def check_data(row):
+        return isinstance(row['ergebnis'], float)
+    df['lcheck'] = df.apply(check_data, axis = 1)
+    df = df.loc[df.loc[:, 'lcheck'] == True].drop('lcheck', axis = 1)
+    df['ergebnis'] = df['ergebnis'].astype('float')
+    for col in df.loc[:, df.dtypes == object]:
+        df[col] = df[col].str.lower()
+    df['messdatum'] = pd.to_datetime(df['messdatum'], format = '%Y-%m-%d')
+    df['probennahmedatum'] = pd.to_datetime(df['probennahmedatum'], format = '%Y-%m-%d')
+    def space(row):
+        return row['probenname'].replace(" ", "")
+    df['probenname'] = df.apply(space, axis = 1)
+    df = df.drop(['nummer', 'instrument', 'messdatum'], axis = 1)
+    df['excel_doc'] = df_name
+    return df
+
+
+# -- mixed_frame --> Excel-like data with text, integers and numeric strings
+def mixed_frame(nrows = 1000, seed = 0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(10.0, 2.0, nrows).astype(object)
+    values[::7]  = 'Probe alle'
+    values[::11] = np.nan
+    values[::13] = 5
+    values[::17] = '3.5'
+    return pd.DataFrame({
+        'Probenname'       : [f'MH {i}' for i in range(nrows)],
+        'Probenjahr'       : np.full(nrows, 2023),
+        'Nummer'           : np.arange(nrows),
+        'Parameter'        : rng.choice(['TIC', 'TOC'], nrows),
+        'Ergebnis'         : values,
+        'Einheit'          : 'Gew-%',
+        'Instrument'       : 'X',
+        'Messdatum'        : '2023-05-01',
+        'Vermuffelt'       : rng.choice(['Ja', 'Nein'], nrows),
+        'Kommentar'        : 'Kein',
+        'Probennahmedatum' : '2023-04-01',
+    })
+
+
+def test_numeric_rows_keeps_only_floats():
+    df = mixed_frame()
+    ref = df.loc[[isinstance(value, float) for value in df['Ergebnis']]]
+    res = l4p.numeric_rows(df, 'Ergebnis')
+    assert res.index.equals(ref.index)
+    assert res['Ergebnis'].dtype == 'float64'
+    # -- Empty cells are kept, text, integers and numeric strings are not:
+    assert res['Ergebnis'].isna().sum() == df['Ergebnis'].isna().sum()
+
+
+def test_apply_schema_matches_old_cleanup():
+    df = mixed_frame()
+    ref = old_cleanup(df.copy(), 'file_1')
+    res = l4p.apply_schema(df[list(l4p.schema4tic_toc)].copy(), l4p.schema4tic_toc)
+    res['excel_doc'] = 'file_1'
+    pd.testing.assert_frame_equal(res, ref[res.columns])
+
+
+@pytest.mark.skipif(len(lst4xls) == 0, reason = 'no sample excel exports')
+@pytest.mark.parametrize('pin', lst4xls, ids = os.path.basename)
+def test_get_data_matches_old_cleanup(pin):
+    df_name = os.path.basename(pin)
+    df_raw = pd.read_excel(pin, **set4excel)
+    ref = old_cleanup(df_raw, df_name)
+    res = l4p.get_data(pin, df_name, set4excel, linfo = False)
+    cols = [col for col in res.columns if col in ref.columns]
+    pd.testing.assert_frame_equal(res[cols], ref[cols], check_categorical = False)
+
+
+def test_read_excel_schema_ignores_header_register(tmp_path):
+    df = mixed_frame(50)
+    df = df.rename(columns = {'Probenname' : 'PROBENNAME', 'Ergebnis' : 'ergebnis'})
+    pin = tmp_path / 'export.xlsx'
+    df.to_excel(pin, index = False)
+    res = l4p.read_excel_schema(pin, {'sheet_name' : 0, 'header' : 0}, l4p.schema4tic_toc)
+    assert list(res.columns) == [col.lower() for col in l4p.schema4tic_toc]
+    assert len(res) == sum(isinstance(value, float) for value in df['ergebnis'])
+
+
+def test_get_file_key_hashes_only_changed_files(tmp_path, monkeypatch):
+    import lib4sys_support as l4s
+    pin = tmp_path / 'export.xls'
+    pin.write_bytes(b'first version')
+    old = l4s.get_file_key(pin, {'version' : 1})
+    # -- Same size and mtime: content is not read again:
+    monkeypatch.setattr(l4s, 'get_file_hash', lambda path: pytest.fail('hashed'))
+    assert l4s.get_file_key(pin, {'version' : 1}, old) == old
+    assert l4s.get_file_key(pin, {'version' : 2}, old)['key'] != old['key']
+    monkeypatch.undo()
+    # -- New content:
+    pin.write_bytes(b'second version!')
+    new = l4s.get_file_key(pin, {'version' : 1}, old)
+    assert new['content'] != old['content'] and new['key'] != old['key']
+
+
+def test_update_store_reads_only_changed_files(tmp_path, monkeypatch):
+    df = mixed_frame(50)
+    lst4paths = []
+    for i in range(2):
+        pin = tmp_path / f'export_{i}.xlsx'
+        df.to_excel(pin, index = False)
+        lst4paths.append(str(pin))
+    lst4names = [os.path.basename(pin) for pin in lst4paths]
+    settings = {'sheet_name' : 0, 'header' : 0}
+    pstore = str(tmp_path / 'store')
+    l4p.update_store(lst4paths, lst4names, settings, pstore, linfo = False)
+    lst4read = []
+    get_data = l4p.get_data
+    monkeypatch.setattr(l4p, 'get_data',
+        lambda pin, *args, **kwargs: lst4read.append(pin) or get_data(pin, *args, **kwargs))
+    l4p.update_store(lst4paths, lst4names, settings, pstore, linfo = False)
+    assert lst4read == []
+    os.utime(lst4paths[1], ns = (0, 0))
+    l4p.update_store(lst4paths, lst4names, settings, pstore, linfo = False)
+    assert lst4read == []
+    df.head(10).to_excel(lst4paths[1], index = False)
+    l4p.update_store(lst4paths, lst4names, settings, pstore, linfo = False)
+    assert lst4read == [lst4paths[1]]
+
+
+# -- old_select_data --> Groupby of select_data with python functions (reference)
+def old_select_data(df, var):
+    df = df.query('parameter in @var').reset_index(drop = True)
+    unique = lambda col: col.dropna().iloc[0] if col.nunique() == 1 else np.nan
+    dct = {
+        'probenjahr': 'mean',
+        'ergebnis'  : 'mean',
+        'einheit'   : unique,
+        'vermuffelt': unique,
+        'kommentar' : unique,
+        'probennahmedatum': 'mean',
+        'excel_doc' : unique,
+    }
+    return df.groupby(['probenname', 'parameter']).agg(**{k: (k, v) for k, v in dct.items()})
+
+
+# -- grouped_frame --> Preprocessed data with ngroups samples (some columns
+#                      are not the same in groups and some values are missing)
+def grouped_frame(ngroups = 1000, size = 4, seed = 0):
+    rng = np.random.default_rng(seed)
+    nrows = ngroups * size
+    kommentar = rng.choice(['kein', 'doppelt'], nrows).astype(object)
+    kommentar[rng.random(nrows) < 0.5] = np.nan
+    return pd.DataFrame({
+        'probenname'       : [f'mh{i}' for i in rng.integers(0, ngroups, nrows)],
+        'probenjahr'       : rng.integers(2020, 2024, nrows),
+        'parameter'        : rng.choice(['tic', 'toc'], nrows),
+        'ergebnis'         : rng.normal(10.0, 2.0, nrows),
+        'einheit'          : 'gew-%',
+        'vermuffelt'       : rng.choice(['ja', 'nein'], nrows, p = [0.1, 0.9]),
+        'kommentar'        : kommentar,
+        'probennahmedatum' : pd.Timestamp('2023-04-01') +
+                             pd.to_timedelta(rng.integers(0, 3, nrows), unit = 'D'),
+        'excel_doc'        : rng.choice(['file_1', 'file_2'], nrows, p = [0.05, 0.95]),
+    })
+
+
+@pytest.mark.parametrize('lcompact', [False, True])
+def test_select_data_matches_old_groupby(lcompact):
+    df = grouped_frame()
+    if lcompact:
+        df = l4p.compact_data(df, linfo = False)
+    res = l4p.select_data(df, ['tic', 'toc'])
+    ref = old_select_data(grouped_frame(), ['tic', 'toc'])
+    # -- Compact data types are compared as original types:
+    cmp = res.reset_index()
+    cmp = cmp.astype({col: object for col in cmp.columns if cmp[col].dtype == 'category'})
+    pd.testing.assert_frame_equal(cmp, ref.reset_index(), check_dtype = not lcompact)
+    # -- Groups with different values get NaN:
+    assert res['kommentar'].isna().any() and res['kommentar'].notna().any()
+
+
+@pytest.mark.parametrize('t1, t2, npoints, level', [
+    ('2020-01-01', '2024-01-01', 1000, 'day'),
+    ('2020-01-01', '2024-01-01',   49, 'month'),
+    ('2020-01-01', '2020-03-01', 1000, 'hour'),
+    ('2023-01-01', '2023-01-02', 1000, '10min'),
+])
+def test_pyramid_level(t1, t2, npoints, level):
+    assert l4p.pyramid_level(pd.Timestamp(t1), pd.Timestamp(t2), npoints) == level
+
+
+def test_station_series_keeps_input_data():
+    df = pd.DataFrame({'T (degC)' : [3.0, 1.0, 2.0]},
+                      index = ['2023-01-03', '2023-01-01', '2023-01-02'])
+    ref = df.copy()
+    data = l4p.StationSeries(df, 'WS_Beutenberg')
+    pd.testing.assert_frame_equal(df, ref)
+    assert data.station == 'WS_Beutenberg'
+    assert list(data.slice('2023-01-02', '2023-01-03')['T (degC)']) == [2.0, 3.0]
+
+
+# -- Columns of raw meteo data (parameters with aggregates of set4resample):
+cols4saaleaue = ['p (mbar)', 'T (degC)', 'rain (mm)', 'SM008 (%)', 'SM128 (%)',
+                 'ST002 (degC)']
+cols4beete    = ['sta010 (°C)', 'sma010 (Vol.%)', 'smd100 (Vol.%)', 'ppt (mm)']
+
+
+# -- meteo_frame --> 10 minutes data of 2 days (second day without precipitation data)
+def meteo_frame(cols, seed = 0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2023-07-01', periods = 288, freq = '10min', name = 'time')
+    df = pd.DataFrame(rng.random((len(index), len(cols))), index = index, columns = cols)
+    df.loc['2023-07-02', [col for col in cols if col.split()[0] in ('rain', 'ppt')]] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('cols, prec, soil', [
+    (cols4saaleaue, 'rain', ['SM008', 'SM128']),
+    (cols4beete   , 'ppt' , ['sma010', 'smd100']),
+])
+def test_resample_data_stations(cols, prec, soil):
+    df = meteo_frame(cols)
+    res = l4p.resample_data(df, 'day')
+    day = df.loc['2023-07-01']
+    # -- Precipitation: sum (NaN for day without data) and number of values:
+    col = next(col for col in cols if col.startswith(prec + ' '))
+    assert np.isclose(res[col].iloc[0], day[col].sum())
+    assert np.isnan(res[col].iloc[1])
+    assert list(res[f'{prec}_count (-)']) == [144, 0]
+    # -- Soil moisture: mean, min and max:
+    for param in soil:
+        col = next(col for col in cols if col.startswith(param + ' '))
+        unit = col.partition(' ')[2]
+        assert np.isclose(res[col].iloc[0], day[col].mean())
+        assert np.isclose(res[f'{param}_min {unit}'].iloc[0], day[col].min())
+        assert np.isclose(res[f'{param}_max {unit}'].iloc[0], day[col].max())
+    # -- Other parameters (soil temperature) get only mean:
+    assert not any(name.startswith(('ST002_', 'sta010_')) for name in res.columns)
+
+
+def test_station_series_date_stop_is_whole_day(tmp_path):
+    df = meteo_frame(cols4saaleaue)
+    data = l4p.StationSeries(df, 'WS_Saaleaue')
+    assert len(data.slice('2023-07-01', '2023-07-01')) == 144
+    assert data.slice(None, '2023-07-01 12:00').index[-1] == pd.Timestamp('2023-07-01 12:00')
+    # -- The same window for station archive:
+    l4p.save_pyramid(l4p.get_pyramid(df), str(tmp_path), 'WS_Saaleaue')
+    df_arc = l4p.read_archive(str(tmp_path), 'WS_Saaleaue', pd.Timestamp('2023-07-01'),
+                              pd.Timestamp('2023-07-01'), level = '10min')
+    assert len(df_arc) == 144
+    series = l4p.StationSeries.from_archive(str(tmp_path), 'WS_Saaleaue', '2023-07-01',
+                                            '2023-07-02', level = 'hour')
+    assert len(series.slice('2023-07-01', '2023-07-02')) == 48
+
+
+def test_metainfo_control_reports_all_problem_files(tmp_path, capsys):
+    df = mixed_frame(5)
+    lst4names = ['a.xlsx', 'b.xlsx', 'c.xlsx', 'd.xlsx']
+    df.to_excel(tmp_path / 'a.xlsx', index = False)
+    (tmp_path / 'b.xlsx').write_bytes(b'not an excel file')
+    df.drop(columns = 'Kommentar').to_excel(tmp_path / 'c.xlsx', index = False)
+    df.to_excel(tmp_path / 'd.xlsx', index = False)
+    lst4paths = [str(tmp_path / name) for name in lst4names]
+    assert l4p.get_header(lst4paths[1], {'sheet_name' : 0})[0] is None
+    with pytest.raises(SystemExit) as err:
+        l4p.metainfo_control(lst4names, lst4paths, {'sheet_name' : 0})
+    assert 'c.xlsx' in str(err.value) and 'b.xlsx' in str(err.value)
+    assert 'd.xlsx' not in str(err.value)
+    assert 'Header in a.xlsx and d.xlsx is the same' in capsys.readouterr().out
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Tests for lib4statistics (statistics of TIC and TOC data)
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import lib4statistics as l4st
+
+
+# -- exp_frame --> Data of experiment (tic and toc)
+def exp_frame(nrows = 100, seed = 0):
+    rng = np.random.default_rng(seed)
+    tic = rng.normal(10.0, 2.0, nrows)
+    return pd.DataFrame({
+        'ergebnis_tic' : tic,
+        'ergebnis_toc' : 2.0 * tic + rng.normal(0.0, 1.0, nrows),
+    })
+
+
+def test_regression_matches_linregress():
+    df = exp_frame()
+    df_desc, df_reg = l4st.get_stats({('mh', 'all') : df})
+    ref = stats.linregress(df['ergebnis_tic'], df['ergebnis_toc'])
+    reg = l4st.get_regression(df_reg, 'mh', 'all')
+    assert reg['n'] == len(df)
+    for name in ['slope', 'intercept', 'rvalue', 'pvalue', 'stderr', 'intercept_stderr']:
+        col = {'rvalue' : 'r_value', 'pvalue' : 'p_value', 'stderr' : 'std_err'}.get(name, name)
+        assert np.isclose(reg[col], getattr(ref, name))
+
+
+def test_variant_without_pairs_gets_nan():
+    df = exp_frame()
+    df_nan = df.assign(ergebnis_toc = np.nan)
+    dct4data = {
+        ('mh', 'all')    : df,
+        ('mh', 'filter') : df_nan,              # No rows with both values
+        ('h', 'all')     : df.iloc[:0],         # No rows
+    }
+    df_desc, df_reg = l4st.get_stats(dct4data)
+    assert list(df_reg.index) == list(dct4data)
+    assert list(df_desc.index) == list(dct4data)
+    for exp, variant in [('mh', 'filter'), ('h', 'all')]:
+        reg = l4st.get_regression(df_reg, exp, variant)
+        assert reg['n'] == 0
+        assert np.isnan(reg['slope']) and np.isnan(reg['intercept'])
+    # -- Experiment which is not in statistics at all:
+    reg = l4st.get_regression(df_reg, 'kh', 'all')
+    assert np.isnan(reg['slope'])
+
+
+def test_update_stats_replaces_rows_of_experiments():
+    df_mh, df_ma = exp_frame(seed = 1), exp_frame(seed = 2)
+    old = {key : l4st.get_stats({('mh', 'all') : df_mh, ('mh', 'filter') : df_mh,
+                                 ('ma', 'all') : df_mh})[i]
+           for i, key in enumerate(['describe', 'regression'])}
+    new = l4st.get_stats({('ma', 'all') : df_ma, ('ma', 'filter') : df_ma})
+    for i, key in enumerate(['describe', 'regression']):
+        res = l4st.update_stats(new[i], l4st.update_stats(old[key]))
+        assert list(zip(res['exp'], res['variant'])) == [
+            ('ma', 'all'), ('ma', 'filter'), ('mh', 'all'), ('mh', 'filter')]
+    # -- Rows of ma are new, rows of mh are old:
+    ref = l4st.get_stats({('ma', 'all') : df_ma})[1]
+    assert res['slope'].iloc[0] == ref['slope'].iloc[0]
+    assert res['slope'].iloc[2] == old['regression']['slope'].iloc[0]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Tests for lib4sys_support (output tables)
+"""
+import pandas as pd
+import pytest
+
+import lib4sys_support as l4s
+
+
+@pytest.mark.parametrize('form', l4s.table_formats)
+def test_write_tables_update_keeps_other_tables(tmp_path, form):
+    pout = str(tmp_path / 'tic_toc')
+    df_mh = pd.DataFrame({'probenname' : ['mh1', 'mh2'], 'ergebnis' : [1.5, 2.5]})
+    df_h  = pd.DataFrame({'probenname' : ['h1'], 'ergebnis' : [3.5]})
+    # -- Runs for two experiments (one after another):
+    l4s.write_tables({'data_mh' : df_mh, 'describe' : df_mh}, pout, form, lupdate = True)
+    l4s.write_tables({'data_h' : df_h, 'describe' : df_h}, pout, form, lupdate = True)
+    pd.testing.assert_frame_equal(l4s.read_table(pout, 'data_mh', form), df_mh)
+    pd.testing.assert_frame_equal(l4s.read_table(pout, 'data_h', form), df_h)
+    pd.testing.assert_frame_equal(l4s.read_table(pout, 'describe', form), df_h)
+
+
+@pytest.mark.parametrize('form', l4s.table_formats)
+def test_write_tables_replaces_old_tables(tmp_path, form):
+    pout = str(tmp_path / 'tic_toc')
+    df = pd.DataFrame({'x' : [1, 2]})
+    l4s.write_tables({'data_mh' : df, 'errors' : df}, pout, form)
+    l4s.write_tables({'data_h' : df}, pout, form)
+    assert l4s.table_names(pout, form) == ['data_h']
+
+
+@pytest.mark.parametrize('form', l4s.table_formats)
+def test_write_tables_update_drops_tables_of_run(tmp_path, form):
+    pout = str(tmp_path / 'tic_toc')
+    df = pd.DataFrame({'x' : [1, 2]})
+    l4s.write_tables({'data_mh' : df, 'errors' : df}, pout, form,
+                     lupdate = True, drop = ['errors'])
+    l4s.write_tables({'data_h' : df}, pout, form, lupdate = True, drop = ['errors'])
+    assert sorted(l4s.table_names(pout, form)) == ['data_h', 'data_mh']
+
+
+def test_is_sheet_of():
+    name = 'data_' + 'x' * 40
+    assert l4s.is_sheet_of(name[:31], name)
+    assert l4s.is_sheet_of(f'{name[:27]}_1', name)
+    assert not l4s.is_sheet_of('data_mh', 'data_m')
+    assert not l4s.is_sheet_of('data_mh_1', 'data_m')
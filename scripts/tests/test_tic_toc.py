@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Description: Tests for rules of problem points in tic_toc (set4rules and
+             l4p.get_flags / flag_rows / apply_rules)
+"""
+import numpy as np
+import pandas as pd
+
+import lib4processing as l4p
+import tic_toc
+
+
+# -- exp_frame --> Data of experiment with values on boundaries of filters
+def exp_frame():
+    return pd.DataFrame({
+        'probenname'   : [f'mh{i}' for i in range(8)],
+        'ergebnis_tic' : [  10.0,  1.0, 150.0, 151.0,  20.0,   0.5, np.nan, 30.0],
+        'ergebnis_toc' : [   5.0,  5.0,   5.0,  26.0,   0.0,  30.0,    5.0, 25.0],
+    })
+
+
+# -- old_exp_filter --> Data with filters before the rules (reference)
+def old_exp_filter(df_exp):
+    tic_filter1, tic_filter2 = tic_toc.tic_filter1, tic_toc.tic_filter2
+    toc_filter1, toc_filter2 = tic_toc.toc_filter1, tic_toc.toc_filter2
+    return df_exp.query(
+        'ergebnis_tic > @tic_filter1 and ergebnis_tic <= @tic_filter2 and '
+        'ergebnis_toc > @toc_filter1 and ergebnis_toc <= @toc_filter2     ')
+
+
+def test_flags_and_reasons():
+    df = exp_frame()
+    flags = l4p.get_flags(df, tic_toc.set4rules)
+    # -- Bits: tic_low - 1, tic_high - 2, toc_low - 4, toc_high - 8:
+    assert list(flags) == [0, 1, 0, 2 | 8, 4, 1 | 8, 0, 0]
+    res = l4p.flag_rows(df, tic_toc.set4rules, flags)
+    assert list(res['reasons']) == [
+        '', 'tic_low', '', 'tic_high; toc_high', 'toc_low', 'tic_low; toc_high', '', '']
+
+
+def test_apply_rules_matches_old_filter():
+    df = exp_frame()
+    df_good, df_prb = tic_toc.exp_filter(df)
+    pd.testing.assert_frame_equal(df_good, old_exp_filter(df))
+    # -- Each problem row only once (rows with several broken rules too),
+    #    rows without values are not problem rows:
+    assert list(df_prb.index) == [1, 3, 4, 5]
+    assert list(df_prb['flags']) == [1, 10, 4, 9]
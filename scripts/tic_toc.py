@@ -16,11 +16,38 @@ Version    Date       Name
            Initial release
     1.2    07.06.2023 Evgenii Churiulin, MPI-BGC
            Code refactoring
+    1.3    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add batch mode for all experiments
+    1.4    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Figures for all experiments are created in one process pool
+    1.5    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Figures with unchanged data and settings are not created again
+    1.6    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Add render profiles for figures (draft, publication) and
+           finalize mode for draft figures
+    1.7    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Density plots instead of scatter plots for big datasets
+    1.8    18.10.2026 Evgenii Churiulin, MPI-BGC
+           Statistics for all experiments in one file (lib4statistics)
+    1.9    18.10.2026 Evgenii Churiulin, MPI-BGC
+           All output tables are saved in one file (l4s.write_tables)
+    1.10   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Problem values are found by rules (set4rules) in one pass
+    1.11   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Line plots of experiment are rendered by nworkers jobs
+    1.12   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Run for one experiment keeps tables of other experiments, fast
+           default format of tables
+    1.13   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Statistics of other experiments are kept, errors of previous runs
+           are deleted
+    1.14   18.10.2026 Evgenii Churiulin, MPI-BGC
+           Unused import of numpy is removed
 """
 # =============================     Import modules     ================
 # -- Standard:
 import os
-import numpy as np
+import sys
 import pandas as pd
 import warnings
 warnings.filterwarnings("ignore")
@@ -28,6 +55,78 @@ warnings.filterwarnings("ignore")
 import lib4sys_support as l4s
 import lib4processing as l4p
 import lib4visualization as l4v
+import lib4statistics as l4st
+# =============================   Personal functions   =================
+# -- exp_filter --> Exclude data (extreme values) based on rules
+def exp_filter(
+        # Input variables:
+        df_exp:pd.DataFrame,              # Data for experiment
+        # Output variables:
+    ) -> tuple[pd.DataFrame,             # Data without extreme values
+               pd.DataFrame,             # Problem points (flags and reasons)
+    ]:
+    return l4p.apply_rules(df_exp, set4rules)
+
+# -- exp_postprocessing --> Output tables and figure jobs for experiment
+def exp_postprocessing(
+        # Input variables:
+        df_exp:pd.DataFrame,              # Data for experiment
+        exp:str,                          # Experiment name
+        dct4reg:dict,                     # Regression parameters {variant : parameters}
+        # Output variables:
+    ) -> tuple[list[tuple], dict]:        # Figure jobs, output tables {table name : dataframe}
+    # -- Output folder for figures:
+    fout = main + f'FIGURES_{exp}'
+    pout_fig  = fout + f'/fig4{exp}'
+    # -- Number of intervals:
+    periods = set4line_plot.get(exp)[0]
+    # -- Make output folder and cleaning previous results:
+    l4s.makefolder(fout)      if lmake_folder  is True else print('lmake_folder = False')
+    l4s.dep_clean(fout + '/') if lclean_folder is True else print('lclean_folder = False')
+
+    # -- Part 4.1 Visualization of data (without filter)
+    # -- Create special list with 2 series:
+    lst4line_plot = [df_exp['ergebnis_tic'], df_exp['ergebnis_toc']]
+    # -- Get linear plots
+    jobs = l4v.line_plot_jobs(len(lst4line_plot), lst4line_plot, set4plots,
+                              set4line_plot, exp, periods, pout_fig,
+                              chunks = nworkers)
+    # -- Get scatter plot:
+    jobs.append(
+        l4v.scatter_plot_job(df_exp, set4scat_plot, exp, plt_name1, pout_fig,
+                             npoints = nscat_points, reg = dct4reg.get('all')))
+    # -- Get boxplot (tic, toc):
+    jobs.append(l4v.boxplot_job(
+        df_exp['ergebnis_tic'], 'ergebnis_tic, mg/l',
+        pout_fig, 'tic', ylim = (set4box_plot.get(exp).get('tic')[0],
+                                 set4box_plot.get(exp).get('tic')[1])
+    ))
+    jobs.append(l4v.boxplot_job(
+        df_exp['ergebnis_toc'], 'ergebnis_toc, mg/l',
+        pout_fig, 'toc', ylim = (set4box_plot.get(exp).get('toc')[0],
+                                 set4box_plot.get(exp).get('toc')[1])
+    ))
+
+    # -- Part 4.2 Visualization of data (with filters)
+    # -- Exclude data (extreme values):
+    df_exp2, df_prb = exp_filter(df_exp)
+    # -- Plot second plots (scratter and boxplots):
+    jobs.append(
+        l4v.scatter_plot_job(df_exp2, set4scat_plot, exp, plt_name2, pout_fig,
+                             npoints = nscat_points, reg = dct4reg.get('filter')))
+    jobs.append(l4v.boxplot_job(
+        df_exp2['ergebnis_tic'], 'ergebnis_tic, mg/l',
+        pout_fig, 'tic2', ylim = (set4box_plot.get(exp).get('tic')[2],
+                                  set4box_plot.get(exp).get('tic')[3])
+    ))
+    jobs.append(l4v.boxplot_job(
+        df_exp2['ergebnis_toc'], 'ergebnis_toc, mg/l',
+        pout_fig, 'toc2', ylim = (set4box_plot.get(exp).get('toc')[2],
+                                  set4box_plot.get(exp).get('toc')[3])
+    ))
+    # -- Output tables for experiment:
+    return jobs, {f'data_{exp}' : df_exp, f'prb_{exp}' : df_prb}
+
 # ================   User settings (have to be adapted)  ==============
 # -- Logical parameters (True / False) --> Important
 lmake_folder  = True   # Do you want to automatically create output folder?
@@ -35,8 +134,14 @@ lclean_folder = False   # Do you want to clean the previous results in output fo
 lauto_read    = True   # Do you want to read all data from your datafolder?
 ldata_quality = True   # Do you want to compare headers in your excel files?
 linfo         = False  # Do you want to get more information about your data
+lcache        = True   # Do you want to save preprocessed data in cache folder?
+lincremental  = False  # Do you want to process only new or changed files?
+lcompact      = False  # Do you want to use compact data types (less memory)?
+lbatch        = False  # Do you want to process all experiments from set4line_plot?
+lfig_cache    = True   # Do you want to skip figures with unchanged data and settings?
+lfinalize     = False  # Do you want only to create final figures for kept draft figures?
 
-# -- Select data (experiment name) --> Important:
+# -- Select data (experiment name, if lbatch = False) --> Important:
 exp = 'mh'
 #exp = 'ma'
 #exp = 'mh-r'
@@ -47,12 +152,9 @@ main ='/Net/Groups/BGI/people/evchur/scripts/project_tic_toc/DATA/'
 # -- Can be the same:
 pin  = main
 pout = main + 'OUTPUT'
-fout = main + f'FIGURES_{exp}'
-
-# -- Select name for output file':
-pout_xlsx = pout + f'/data4_{exp}'
-pout_stat = pout + f'/stat4_{exp}'
-pout_fig  = fout + f'/fig4{exp}'
+pcache = main + 'CACHE'
+pstore = main + 'STORE'
+pqueue = pout + '/render_queue.pkl'
 
 # -- Settings for excel files:
 set4excel = {
@@ -101,16 +203,33 @@ tic_filter1 = 1
 tic_filter2 = 150
 toc_filter1 = 0
 toc_filter2 = 25
+
+# -- Rules for problem points {rule name : [column, operator, value]},
+#    operators: <, <=, >, >=, ==, !=. Points with any broken rule (or
+#    without values) are excluded from data with filters:
+set4rules = {
+    'tic_low'  : ['ergebnis_tic', '<=', tic_filter1],
+    'tic_high' : ['ergebnis_tic', '>' , tic_filter2],
+    'toc_low'  : ['ergebnis_toc', '<=', toc_filter1],
+    'toc_high' : ['ergebnis_toc', '>' , toc_filter2],
+}
   
 #================   User settings (can be the same)  =======================
-#-- Mask for filtering data
-exp_mask = f'^{exp}[0-9]' 
+#-- Output format for tables ('.xlsx' - one file with sheets, '.csv',
+#   '.parquet', '.feather' - one file for each table). Default: parquet (or csv
+#   without pyarrow), excel is much slower for big tables:
+form_table = l4s.table_format
 
-#-- Number of intervals
-periods = set4line_plot.get(exp)[0]
+#-- Number of processes for parallel calculations:
+nworkers = 4
 
-#-- Output format for:
-form_table = '.xlsx'
+#-- Render profile for figures: 'draft' (fast, low dpi, figures are saved in
+#   queue for lfinalize) or 'publication' (300 dpi):
+plt_profile = 'publication'
+
+#-- Max number of points for scatter plots (if data has more points, density
+#   plot is created):
+nscat_points = 5000
 
 #-- Plot prefix:
 plt_name1 = 1
@@ -118,6 +237,12 @@ plt_name2 = 2
 # =============================    Main program   =====================
 if __name__ == '__main__':
 
+    #-- Part 0. Create final figures for draft figures (delete draft figures,
+    #   which you do not need, before):
+    if lfinalize is True:
+        l4v.finalize_figures(pqueue, workers = nworkers)
+        sys.exit()
+
     #-- Part 1. Get filenames and create list with absolute data paths:
     #-- Get all dataset names from the folder:
     if lauto_read == True:
@@ -142,79 +267,66 @@ if __name__ == '__main__':
 
     #-- Part 2. Run quality control test (important for the first run)
     if ldata_quality is True:
-        l4p.metainfo_control(lst4names, lst4paths, set4excel)
+        l4p.metainfo_control(lst4names, lst4paths, set4excel, workers = nworkers)
 
     #-- Part 3. Get data
     #-- Get data from our experiments (only data preprocessing)
-    lst4df = []
-    for i in range(len(lst4paths)):
-        print(lst4names[i])
-        lst4df.append(
-            l4p.get_data(lst4paths[i], lst4names[i], set4excel, linfo = linfo)
+    if lincremental is True:
+        # Only new or changed files, average data is saved in the store folder:
+        df_agg, df_err = l4p.update_store(
+            lst4paths, lst4names, set4excel, pstore, workers = nworkers,
+            lcompact = lcompact, linfo = linfo,
         )
+    else:
+        lst4df, df_err = l4p.get_data_many(
+            lst4paths, lst4names, set4excel, workers = nworkers,
+            pcache = pcache if lcache is True else None, linfo = linfo,
+        )
+        df_agg = l4p.get_all_data(lst4df, lcompact = lcompact, linfo = linfo)
 
-    #-- Get data for experiments
-    df_exp = l4p.get_exp_data(lst4df, exp_mask)
+    #-- Get index of experiments
+    df_agg, exp_index = l4p.get_exp_index(df_agg)
 
     #-- Path 4. Postprocessing
-    # -- Make output folders and cleaning previous results:
+    # -- Make output folder and cleaning previous results:
     l4s.makefolder(pout)      if lmake_folder  is True else print('lmake_folder = False')
     l4s.dep_clean(pout + '/') if lclean_folder is True else print('lclean_folder = False')
-    l4s.makefolder(fout)      if lmake_folder  is True else print('lmake_folder = False')
-    l4s.dep_clean(fout + '/') if lclean_folder is True else print('lclean_folder = False')
-    # -- Save output files for experiment:
-    df_exp.to_excel(pout_xlsx + form_table,  sheet_name = f'{exp}_data')
-
-    # -- Part 4.1 Visualization of data (without filter)
-    # -- Create special list with 2 series:
-    lst4line_plot = [df_exp['ergebnis_tic'], df_exp['ergebnis_toc']]
-    # -- Get linear plots
-    l4v.line_plots(len(lst4line_plot), lst4line_plot, set4plots, set4line_plot,
-                   exp, periods, pout_fig)
-    # -- Get scatter plot:
-    l4v.scatter_plots(df_exp, set4scat_plot, exp, plt_name1, pout_fig)
-    # -- Get boxplot (tic, toc):
-    l4v.boxplots(
-        df_exp['ergebnis_tic'], 'ergebnis_tic, mg/l',
-        pout_fig, 'tic', ylim = (set4box_plot.get(exp).get('tic')[0],
-                                 set4box_plot.get(exp).get('tic')[1])
-    )
-    l4v.boxplots(
-        df_exp['ergebnis_toc'], 'ergebnis_toc, mg/l',
-        pout_fig, 'toc', ylim = (set4box_plot.get(exp).get('toc')[0],
-                                 set4box_plot.get(exp).get('toc')[1])
-    )
-    # -- Get statistic:
-    stat_tic = df_exp['ergebnis_tic'].describe()
-    stat_tic.to_excel(pout_stat + f'_tic{form_table}',  sheet_name = f'{exp}_data')
-
-    stat_toc = df_exp['ergebnis_tic'].describe()
-    stat_toc.to_excel(pout_stat + f'_toc{form_table}',  sheet_name = f'{exp}_data')
-
-    # -- Part 4.2 Visualization of data (with filters)
-    # -- Exclude data (extreme values):
-    df_exp2 = df_exp.query(
-        'ergebnis_tic > @tic_filter1 and ergebnis_tic <= @tic_filter2 and '
-        'ergebnis_toc > @toc_filter1 and ergebnis_toc <= @toc_filter2     ')
-    # -- Plot second plots (scratter and boxplots):
-    l4v.scatter_plots(df_exp2, set4scat_plot, exp, plt_name2, pout_fig)
-    l4v.boxplots(
-        df_exp2['ergebnis_tic'], 'ergebnis_tic, mg/l',
-        pout_fig, 'tic2', ylim = (set4box_plot.get(exp).get('tic')[2],
-                                  set4box_plot.get(exp).get('tic')[3])
-    )
-    l4v.boxplots(
-        df_exp2['ergebnis_toc'], 'ergebnis_toc, mg/l',
-        pout_fig, 'toc2', ylim = (set4box_plot.get(exp).get('toc')[2],
-                                  set4box_plot.get(exp).get('toc')[3])
+    # -- Output tables and figures for experiments (all experiments are
+    #    based on the same average data):
+    lst4exp = list(set4line_plot) if lbatch is True else [exp]
+    dct4exp = {exp_id : l4p.get_exp(df_agg, exp_index, exp_id) for exp_id in lst4exp}
+    # -- Get statistics for all experiments (without and with filters):
+    dct4data = {}
+    for exp_id, df_exp in dct4exp.items():
+        dct4data[(exp_id, 'all')]    = df_exp
+        dct4data[(exp_id, 'filter')] = exp_filter(df_exp)[0]
+    df_desc, df_reg = l4st.get_stats(dct4data)
+    lst4res = l4s.run_parallel(
+        exp_postprocessing,
+        [(df_exp, exp_id,
+          {var : l4st.get_regression(df_reg, exp_id, var) for var in ['all', 'filter']})
+         for exp_id, df_exp in dct4exp.items()],
+        nworkers,
     )
-    # -- Create dataframe and save it with problem points:
-    non_values = np.nan
-    df_ext1 = df_exp.query('ergebnis_tic <  @tic_filter1')
-    df_ext2 = df_exp.query('ergebnis_tic >= @tic_filter2')
-    df_ext3 = df_exp.query('ergebnis_toc <  @toc_filter1')
-    df_ext4 = df_exp.query('ergebnis_toc >  @toc_filter2')
-    df_prb = pd.concat([df_ext1, df_ext2, df_ext3, df_ext4], axis = 0)
-    # -- Save output files:
-    df_prb.to_excel(pout_xlsx + f'_prb{form_table}',  sheet_name = f'{exp}_data')
+    # -- Save all output tables in one file (tables of experiments, statistics
+    #    and files which were not processed). Run for one experiment replaces
+    #    only its tables and its rows of statistics, tables of other
+    #    experiments are kept. Errors of previous runs are deleted:
+    pout_table = pout + '/tic_toc'
+    lst4old = l4s.table_names(pout_table, form_table) if lbatch is False else []
+    dct4tables = {}
+    for jobs, tables in lst4res:
+        dct4tables.update(tables)
+    for name, df in {'describe' : df_desc, 'regression' : df_reg}.items():
+        df_old = (l4s.read_table(pout_table, name, form_table)
+                  if name in lst4old else None)
+        dct4tables[name] = l4st.update_stats(df, df_old)
+    if len(df_err) > 0:
+        dct4tables['errors'] = df_err
+    l4s.write_tables(dct4tables, pout_table, form_table,
+                     lupdate = lbatch is False, drop = ['errors'])
+    # -- Create figures for all experiments (one process pool):
+    l4v.render_figures([job for jobs, tables in lst4res for job in jobs], nworkers,
+                       lcache = lfig_cache, profile = plt_profile,
+                       pqueue = pqueue)
 # =============================    End of program   ==================